@@ -2,25 +2,18 @@ from flask import Flask, render_template, jsonify, request, session
 from models import *
 from services import *
 import uuid
-import time
+import atexit
 
 app = Flask(__name__)
 app.config.from_object('config.Config')
 
-rule_engine = RuleEngine()
-neural_engine = NeuralEngine()
-hybrid_engine = HybridEngine()
+diagnosis_service = DiagnosisService(app.config)
+atexit.register(diagnosis_service.close)
 
 @app.route('/')
 def index():
     if 'user_id' not in session:
         session['user_id'] = str(uuid.uuid4())
-        session['conversation_state'] = {
-            "awaiting_clarification": None,
-            "original_query": None,
-            "clarified_engine": None,
-            "timestamp": time.time()
-        }
     return render_template('index.html')
 
 @app.route('/slides')
@@ -33,71 +26,52 @@ def page_not_found(e):
 
 @app.route('/api/diagnose', methods=['POST'])
 def diagnose():
-    data = request.json
-    user_query = data.get('query', '')
-    engine_type = data.get('engine', 'hybrid')
-    
     if 'user_id' not in session:
         session['user_id'] = str(uuid.uuid4())
-        session['conversation_state'] = {
-            "awaiting_clarification": None,
-            "original_query": None,
-            "clarified_engine": None,
-            "timestamp": time.time()
-        }
+    if 'conversation_state' in session:
+        session.pop('conversation_state')
     
-    conversation_state = session.get('conversation_state')
-        
-    query_result = process_query(user_query, conversation_state)
+    diagnostic_results, headers = diagnosis_service.diagnose(session['user_id'], request.json)
     
+    response = jsonify(diagnostic_results)
+    response.headers.update(headers)
+    return response
+
+@app.route('/api/fault/<path:fault_id>', methods=['GET'])
+def get_fault(fault_id):
+    detail, version = diagnosis_service.fault(fault_id)
+    if detail is None:
+        return jsonify({"status": "error", "message": "Fault not found"}), 404
+
+    response = jsonify(detail)
+    response.set_etag(version)
+    # Revalidate on every use: a hot reload can change the fault behind an id
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/api/queries', methods=['GET'])
+def list_queries():
+    limit = max(1, min(request.args.get('limit', 50, type=int), 200))
+    try:
+        cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError:
+        return jsonify({"status": "error", "message": "Invalid cursor"}), 400
+
     with session_maker() as db_session:
-        query_record = Query(
-            text=user_query,
-            clarification_requested=query_result.get('needs_clarification', False),
-            clarification_type=query_result.get('awaiting_clarification'),
-            processed_text=query_result.get('processed_query'),
-            enhanced_text=query_result.get('enhanced_query'),
-            engine_type=engine_type,
-            parent_query_id=conversation_state.get('last_query_id')
+        history = query_history(
+            db_session,
+            limit=limit,
+            cursor=cursor,
+            engine_type=request.args.get('engine'),
+            clarification_type=request.args.get('clarification_type')
         )
-        db_session.add(query_record)
-        db_session.commit()
-        last_query_id = query_record.id
-    
-    session['conversation_state'] = {
-        "awaiting_clarification": query_result.get('awaiting_clarification'),
-        "original_query": query_result.get('original_query_for_clarification'),
-        "clarified_engine": query_result.get('clarified_engine'),
-        "timestamp": time.time(),
-        "last_query_id": last_query_id
-    }
-    
-    if query_result.get('needs_clarification', False):
-        return jsonify({
-            "type": "clarification",
-            "message": query_result.get('clarification_message'),
-            "awaiting": query_result.get('awaiting_clarification')
-        })
-    
-    enhanced_query = query_result.get('enhanced_query')
-    
-    if engine_type == 'rule':
-        diagnostic_results = rule_engine.process(enhanced_query, processed_data=query_result)
-    elif engine_type == 'neural':
-        diagnostic_results = neural_engine.process(enhanced_query, processed_data=query_result)
-    else:
-        diagnostic_results = hybrid_engine.process(enhanced_query, processed_data=query_result)
-        
-    return jsonify(diagnostic_results)
+    return jsonify(history)
 
 @app.route('/api/reset_conversation', methods=['POST'])
 def reset_conversation():
-    session['conversation_state'] = {
-        "awaiting_clarification": None,
-        "original_query": None,
-        "clarified_engine": None,
-        "timestamp": time.time()
-    }
+    if 'user_id' in session:
+        diagnosis_service.reset(session['user_id'])
     return jsonify({"status": "success", "message": "Conversation reset"})
 
 if __name__ == '__main__':
@@ -0,0 +1,108 @@
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi.staticfiles import StaticFiles
+from jinja2 import Environment, FileSystemLoader
+from starlette.middleware.sessions import SessionMiddleware
+from config import Config
+from models.DB_class import session_maker
+from services import DiagnosisService, query_history, decode_cursor
+
+# Run with: uvicorn asgi:app --workers <cores>
+# Preprocessing, rule scoring and query encoding are CPU-bound and stay
+# synchronous; the event loop hands them to a bounded thread pool so slow
+# clients and the query log never hold a worker thread.
+
+config = {name: getattr(Config, name) for name in dir(Config) if name.isupper()}
+
+diagnosis_service = DiagnosisService(config)
+executor = ThreadPoolExecutor(max_workers=config['ASGI_WORKER_THREADS'], thread_name_prefix='asgi-worker')
+pending = asyncio.Semaphore(config['ASGI_MAX_PENDING'])
+
+templates = Environment(loader=FileSystemLoader('templates'), autoescape=True)
+templates.globals['url_for'] = lambda endpoint, filename: f'/{endpoint}/{filename}'
+
+app = FastAPI(docs_url=None, redoc_url=None, openapi_url=None)
+app.add_middleware(SessionMiddleware, secret_key=Config.SECRET_KEY)
+app.mount('/static', StaticFiles(directory='static'), name='static')
+
+
+async def run_in_executor(function, *args):
+    async with pending:
+        return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+
+def conversation_id(request):
+    if 'user_id' not in request.session:
+        request.session['user_id'] = str(uuid.uuid4())
+    return request.session['user_id']
+
+
+@app.on_event('shutdown')
+def shutdown():
+    executor.shutdown(wait=True)
+    diagnosis_service.close()
+
+
+@app.get('/', response_class=HTMLResponse)
+async def index(request: Request):
+    conversation_id(request)
+    return templates.get_template('index.html').render()
+
+
+@app.get('/slides', response_class=HTMLResponse)
+async def slides():
+    return templates.get_template('slides.html').render()
+
+
+@app.post('/api/diagnose')
+async def diagnose(request: Request):
+    data = await request.json()
+    diagnostic_results, headers = await run_in_executor(diagnosis_service.diagnose, conversation_id(request), data)
+    return JSONResponse(diagnostic_results, headers=headers)
+
+
+@app.get('/api/fault/{fault_id:path}')
+async def get_fault(fault_id: str, request: Request):
+    detail, version = diagnosis_service.fault(fault_id)
+    if detail is None:
+        return JSONResponse({"status": "error", "message": "Fault not found"}, status_code=404)
+
+    headers = {
+        'ETag': f'"{version}"',
+        'Cache-Control': 'public, no-cache'
+    }
+    if request.headers.get('if-none-match') == headers['ETag']:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(detail, headers=headers)
+
+
+def list_queries_sync(limit, cursor, engine_type, clarification_type):
+    with session_maker() as db_session:
+        return query_history(
+            db_session,
+            limit=limit,
+            cursor=cursor,
+            engine_type=engine_type,
+            clarification_type=clarification_type
+        )
+
+
+@app.get('/api/queries')
+async def list_queries(limit: int = 50, cursor: str = None, engine: str = None, clarification_type: str = None):
+    limit = max(1, min(limit, 200))
+    try:
+        cursor = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return JSONResponse({"status": "error", "message": "Invalid cursor"}, status_code=400)
+
+    return await run_in_executor(list_queries_sync, limit, cursor, engine, clarification_type)
+
+
+@app.post('/api/reset_conversation')
+async def reset_conversation(request: Request):
+    if 'user_id' in request.session:
+        await run_in_executor(diagnosis_service.reset, request.session['user_id'])
+    return {"status": "success", "message": "Conversation reset"}
@@ -0,0 +1,34 @@
+"""Add query uuids
+
+Revision ID: 5c2e8d41a7f3
+Revises: 03afade9baee
+Create Date: 2026-10-17 10:12:31.418209
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c2e8d41a7f3'
+down_revision: Union[str, None] = '03afade9baee'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('queries') as batch_op:
+        batch_op.add_column(sa.Column('query_uuid', sa.String(length=36), nullable=True))
+        batch_op.add_column(sa.Column('parent_query_uuid', sa.String(length=36), nullable=True))
+        batch_op.create_unique_constraint('uq_queries_query_uuid', ['query_uuid'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('queries') as batch_op:
+        batch_op.drop_constraint('uq_queries_query_uuid', type_='unique')
+        batch_op.drop_column('parent_query_uuid')
+        batch_op.drop_column('query_uuid')
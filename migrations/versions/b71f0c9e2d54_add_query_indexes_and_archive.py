@@ -0,0 +1,56 @@
+"""Add query indexes and archive table
+
+Revision ID: b71f0c9e2d54
+Revises: 5c2e8d41a7f3
+Create Date: 2026-10-17 14:03:52.927114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b71f0c9e2d54'
+down_revision: Union[str, None] = '5c2e8d41a7f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_queries_timestamp', 'queries', ['timestamp'])
+    op.create_index('ix_queries_parent_query_id', 'queries', ['parent_query_id'])
+    op.create_index('ix_queries_parent_query_uuid', 'queries', ['parent_query_uuid'])
+    op.create_index('ix_queries_engine_type_timestamp', 'queries', ['engine_type', 'timestamp'])
+    op.create_index('ix_queries_clarification_type_timestamp', 'queries', ['clarification_type', 'timestamp'])
+
+    op.create_table('queries_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('clarification_requested', sa.Boolean(), nullable=True),
+    sa.Column('clarification_type', sa.String(length=50), nullable=True),
+    sa.Column('processed_text', sa.Text(), nullable=True),
+    sa.Column('enhanced_text', sa.Text(), nullable=True),
+    sa.Column('engine_type', sa.String(length=20), nullable=True),
+    sa.Column('parent_query_id', sa.Integer(), nullable=True),
+    sa.Column('query_uuid', sa.String(length=36), nullable=True),
+    sa.Column('parent_query_uuid', sa.String(length=36), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_queries_archive_timestamp', 'queries_archive', ['timestamp'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_queries_archive_timestamp', table_name='queries_archive')
+    op.drop_table('queries_archive')
+
+    op.drop_index('ix_queries_clarification_type_timestamp', table_name='queries')
+    op.drop_index('ix_queries_engine_type_timestamp', table_name='queries')
+    op.drop_index('ix_queries_parent_query_uuid', table_name='queries')
+    op.drop_index('ix_queries_parent_query_id', table_name='queries')
+    op.drop_index('ix_queries_timestamp', table_name='queries')
@@ -1,3 +1,4 @@
 from .DB_class import Base, session_maker, engine
 from .query_class import Query
+from .query_archive_class import QueryArchive
 from .yaml_path_class import YamlPath
@@ -0,0 +1,28 @@
+import models.DB_class as db
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Index
+from datetime import datetime
+
+class QueryArchive(db.Base):
+    __tablename__ = 'queries_archive'
+    __table_args__ = (
+        Index('ix_queries_archive_timestamp', 'timestamp'),
+    )
+    
+    # Same columns as queries; ids are copied so parent_query_id still resolves
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    text = Column(Text, nullable=False)
+    timestamp = Column(DateTime)
+
+    clarification_requested = Column(Boolean)
+    clarification_type = Column(String(50), nullable=True)
+
+    processed_text = Column(Text, nullable=True)
+    enhanced_text = Column(Text, nullable=True)
+
+    engine_type = Column(String(20), nullable=True)
+
+    parent_query_id = Column(Integer, nullable=True)
+    query_uuid = Column(String(36), nullable=True)
+    parent_query_uuid = Column(String(36), nullable=True)
+
+    archived_at = Column(DateTime, default=datetime.now)
@@ -1,9 +1,16 @@
 import models.DB_class as db
-from sqlalchemy import Column, Integer, String, Date, Text, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, Date, Text, DateTime, Boolean, Index
 from datetime import datetime
 
 class Query(db.Base):
     __tablename__ = 'queries'
+    __table_args__ = (
+        Index('ix_queries_timestamp', 'timestamp'),
+        Index('ix_queries_parent_query_id', 'parent_query_id'),
+        Index('ix_queries_parent_query_uuid', 'parent_query_uuid'),
+        Index('ix_queries_engine_type_timestamp', 'engine_type', 'timestamp'),
+        Index('ix_queries_clarification_type_timestamp', 'clarification_type', 'timestamp'),
+    )
     
     id = Column(Integer, primary_key=True)
     text = Column(Text, nullable=False)
@@ -18,3 +25,8 @@ class Query(db.Base):
     engine_type = Column(String(20), nullable=True)
 
     parent_query_id = Column(Integer, nullable=True)
+
+    # Generated before the row is written so follow-up queries can point at a
+    # parent that the write-behind logger has not inserted yet
+    query_uuid = Column(String(36), nullable=True, unique=True)
+    parent_query_uuid = Column(String(36), nullable=True)
@@ -1,4 +1,36 @@
-from .rule_engine import RuleEngine
-from .neural_engine import NeuralEngine
-from .hybrid_engine import HybridEngine
-from .input_preprocessing import process_query
\ No newline at end of file
+import importlib
+
+# Submodules are imported on first attribute access so that, for example, a
+# rule-only worker never loads the neural engine's dependencies. Modules that
+# talk to the database (query_logger, query_history) import SQLAlchemy and
+# models inside their functions, so `from services import *` does not create
+# the database engine either.
+_exports = {
+    'RuleEngine': '.rule_engine',
+    'NeuralEngine': '.neural_engine',
+    'HybridEngine': '.hybrid_engine',
+    'ModelRegistry': '.model_registry',
+    'get_model_registry': '.model_registry',
+    'DiagnosisCache': '.diagnosis_cache',
+    'create_cache_backend': 'utils.cache',
+    'ConversationStore': '.conversation_store',
+    'compact_response': '.response_format',
+    'QueryLogger': '.query_logger',
+    'query_history': '.query_history',
+    'decode_cursor': '.query_history',
+    'DiagnosisService': '.diagnosis_service',
+    'process_query': '.input_preprocessing',
+    'preprocess_many': '.input_preprocessing'
+}
+
+__all__ = list(_exports)
+
+
+def __getattr__(name):
+    module = _exports.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
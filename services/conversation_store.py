@@ -0,0 +1,47 @@
+import time
+from utils.cache import LRUCache
+
+
+def new_conversation_state():
+    return {
+        "awaiting_clarification": None,
+        "original_query": None,
+        "clarified_engine": None,
+        "timestamp": time.time()
+    }
+
+
+class ConversationStore:
+    """
+    Server-side conversation state keyed by the ID kept in the session cookie.
+    The backend is an LRUCache or, to share state between worker processes, a
+    SQLiteCache; both evict by size and drop conversations idle for longer
+    than their ttl. A pending clarification older than clarification_ttl is
+    discarded, so a late reply is treated as a fresh query.
+    """
+
+    def __init__(self, backend=None, clarification_ttl=600):
+        self.backend = backend if backend is not None else LRUCache(max_size=10000, ttl=3600)
+        self.clarification_ttl = clarification_ttl
+
+    def get(self, conversation_id):
+        state = self.backend.get(conversation_id)
+        if state is None:
+            return new_conversation_state()
+
+        if (state.get('awaiting_clarification') and self.clarification_ttl and
+                time.time() - state.get('timestamp', 0) > self.clarification_ttl):
+            expired = new_conversation_state()
+            expired['last_query_uuid'] = state.get('last_query_uuid')
+            return expired
+
+        return state
+
+    def save(self, conversation_id, state):
+        self.backend.set(conversation_id, state)
+
+    def reset(self, conversation_id):
+        self.backend.delete(conversation_id)
+
+    def stats(self):
+        return self.backend.stats()
@@ -0,0 +1,52 @@
+import json
+import threading
+from utils.cache import LRUCache
+from utils.knowledge_base import get_knowledge_base
+from services.model_registry import get_model_registry
+
+
+class DiagnosisCache:
+    def __init__(self, backend=None, knowledge_base=None, registry=None, track_embeddings=True):
+        # An empty cache has len() == 0, so test for None rather than truthiness
+        self.backend = backend if backend is not None else LRUCache()
+        self.knowledge_base = knowledge_base or get_knowledge_base()
+        self.registry = registry or get_model_registry()
+        self.track_embeddings = track_embeddings
+        self._version = None
+        self._lock = threading.Lock()
+
+    def version(self):
+        if not self.track_embeddings:
+            return f"{self.knowledge_base.version}:"
+        try:
+            embeddings_version = self.registry.get_embedding_store().version
+        except FileNotFoundError:
+            embeddings_version = ''
+        return f"{self.knowledge_base.version}:{embeddings_version}"
+
+    def _current_version(self):
+        version = self.version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    if self._version is not None:
+                        self.backend.clear()
+                    self._version = version
+        return version
+
+    def key(self, enhanced_query, engine_type, clarified_engine=None):
+        return json.dumps([self._current_version(), engine_type, clarified_engine, enhanced_query])
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, results):
+        if isinstance(results, dict) and results.get('partial'):
+            return
+        self.backend.set(key, results)
+
+    def invalidate(self):
+        self.backend.clear()
+
+    def stats(self):
+        return self.backend.stats()
@@ -0,0 +1,181 @@
+import time
+import uuid
+from services.rule_engine import RuleEngine
+from services.neural_engine import NeuralEngine
+from services.hybrid_engine import HybridEngine
+from services.executor import get_executor
+from services.model_registry import get_model_registry
+from services.diagnosis_cache import DiagnosisCache
+from services.conversation_store import ConversationStore
+from services.query_logger import QueryLogger
+from services.response_format import compact_response
+from services.input_preprocessing import process_query, set_english_fallback
+from utils.cache import create_cache_backend
+from utils.knowledge_base import get_knowledge_base, KnowledgeBaseWatcher, fault_detail
+
+
+def client_query_id(value, previous_query_id=None):
+    try:
+        query_id = str(uuid.UUID(str(value)))
+    except ValueError:
+        return str(uuid.uuid4())
+    # a replayed id would otherwise be logged as its own parent
+    if query_id == previous_query_id:
+        return str(uuid.uuid4())
+    return query_id
+
+
+def server_timing_header(timings):
+    metrics = []
+    for name, seconds in timings.items():
+        if seconds is None:
+            metrics.append(f'{name};desc="timeout"')
+        else:
+            metrics.append(f'{name};dur={seconds * 1000:.1f}')
+    return ', '.join(metrics)
+
+
+class DiagnosisService:
+    """
+    Everything behind /api/diagnose, built once per process from a config
+    mapping, so the Flask app and the ASGI app share one implementation.
+    """
+
+    def __init__(self, config):
+        set_english_fallback(config.get('SPELLING_ENGLISH_FALLBACK', True))
+
+        self.rule_engine = RuleEngine()
+
+        # With the neural engine disabled the worker answers every query with the rule
+        # engine and never imports sentence_transformers/torch.
+        if config.get('NEURAL_ENGINE_ENABLED', True):
+            get_model_registry().warmup()
+
+            self.neural_engine = NeuralEngine()
+            self.hybrid_engine = HybridEngine(
+                rule_engine=self.rule_engine,
+                neural_engine=self.neural_engine,
+                latency_budget=config.get('HYBRID_LATENCY_BUDGET', 2.0),
+                executor=get_executor(config.get('ENGINE_WORKERS', 4)),
+                mode=config.get('HYBRID_MODE', 'parallel'),
+                cascade_confidence=config.get('HYBRID_CASCADE_CONFIDENCE', 0.75),
+                cascade_margin=config.get('HYBRID_CASCADE_MARGIN', 0.15)
+            )
+        else:
+            self.neural_engine = None
+            self.hybrid_engine = None
+
+        self.diagnosis_cache = DiagnosisCache(
+            create_cache_backend(
+                config.get('DIAGNOSIS_CACHE_BACKEND', 'memory'),
+                path=config.get('DIAGNOSIS_CACHE_PATH'),
+                max_size=config.get('DIAGNOSIS_CACHE_SIZE', 4096)
+            ),
+            track_embeddings=self.neural_engine is not None
+        )
+
+        self.conversation_store = ConversationStore(
+            create_cache_backend(
+                config.get('CONVERSATION_STORE_BACKEND', 'memory'),
+                path=config.get('CONVERSATION_STORE_PATH'),
+                max_size=config.get('CONVERSATION_STORE_SIZE', 10000),
+                ttl=config.get('CONVERSATION_TTL', 3600),
+                table='conversations'
+            ),
+            clarification_ttl=config.get('CLARIFICATION_TTL', 600)
+        )
+
+        self.query_logger = QueryLogger(
+            max_queue=config.get('QUERY_LOG_QUEUE_SIZE', 10000),
+            batch_size=config.get('QUERY_LOG_BATCH_SIZE', 200),
+            flush_interval=config.get('QUERY_LOG_FLUSH_INTERVAL', 0.5),
+            put_timeout=config.get('QUERY_LOG_PUT_TIMEOUT', 0.0)
+        ).start()
+
+        self.knowledge_base_watcher = None
+        if config.get('KNOWLEDGE_BASE_RELOAD_INTERVAL'):
+            self.knowledge_base_watcher = KnowledgeBaseWatcher(
+                get_knowledge_base(),
+                interval=config['KNOWLEDGE_BASE_RELOAD_INTERVAL']
+            ).start()
+
+    def diagnose(self, conversation_id, data):
+        """
+        Returns the JSON body and the extra response headers for one
+        /api/diagnose request.
+        """
+        user_query = data.get('query', '')
+        engine_type = data.get('engine', 'hybrid')
+        if self.neural_engine is None:
+            engine_type = 'rule'
+        compact = data.get('view') == 'compact'
+
+        conversation_state = self.conversation_store.get(conversation_id)
+
+        query_result = process_query(user_query, conversation_state)
+
+        query_id = client_query_id(data.get('query_id'), conversation_state.get('last_query_uuid'))
+        self.query_logger.log(
+            query_id,
+            user_query,
+            parent_query_uuid=conversation_state.get('last_query_uuid'),
+            clarification_requested=query_result.get('needs_clarification', False),
+            clarification_type=query_result.get('awaiting_clarification'),
+            processed_text=query_result.get('processed_query'),
+            enhanced_text=query_result.get('enhanced_query'),
+            engine_type=engine_type
+        )
+
+        self.conversation_store.save(conversation_id, {
+            "awaiting_clarification": query_result.get('awaiting_clarification'),
+            "original_query": query_result.get('original_query_for_clarification'),
+            "clarified_engine": query_result.get('clarified_engine'),
+            "timestamp": time.time(),
+            "last_query_uuid": query_id
+        })
+
+        headers = {'X-Query-Id': query_id}
+
+        if query_result.get('needs_clarification', False):
+            return {
+                "type": "clarification",
+                "message": query_result.get('clarification_message'),
+                "awaiting": query_result.get('awaiting_clarification')
+            }, headers
+
+        enhanced_query = query_result.get('enhanced_query')
+
+        timings = {}
+        cache_key = self.diagnosis_cache.key(enhanced_query, engine_type, query_result.get('clarified_engine'))
+        diagnostic_results = self.diagnosis_cache.get(cache_key)
+
+        if diagnostic_results is None:
+            if engine_type == 'rule':
+                diagnostic_results = self.rule_engine.process(enhanced_query, processed_data=query_result)
+            elif engine_type == 'neural':
+                diagnostic_results = self.neural_engine.process(enhanced_query, processed_data=query_result)
+            else:
+                diagnostic_results, timings = self.hybrid_engine.process_timed(enhanced_query, processed_data=query_result)
+            self.diagnosis_cache.set(cache_key, diagnostic_results)
+
+        if compact:
+            diagnostic_results = compact_response(diagnostic_results)
+
+        if timings:
+            headers['Server-Timing'] = server_timing_header(timings)
+        return diagnostic_results, headers
+
+    def fault(self, fault_id):
+        snapshot = get_knowledge_base().snapshot
+        fault = snapshot.get_fault_by_id(fault_id)
+        if fault is None:
+            return None, snapshot.version
+        return fault_detail(fault), snapshot.version
+
+    def reset(self, conversation_id):
+        self.conversation_store.reset(conversation_id)
+
+    def close(self):
+        self.query_logger.close()
+        if self.knowledge_base_watcher is not None:
+            self.knowledge_base_watcher.stop()
@@ -0,0 +1,17 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+ENGINE_WORKERS = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor(max_workers=None):
+    # The first caller sizes the pool; later calls share it
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max_workers or ENGINE_WORKERS, thread_name_prefix='engine')
+    return _executor
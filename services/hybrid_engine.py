@@ -1,22 +1,119 @@
-from services.rule_engine import RuleEngine
-from services.neural_engine import NeuralEngine
+import time
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import TimeoutError
+from services.executor import get_executor
+
+logger = logging.getLogger(__name__)
 
 class HybridEngine:
-    def __init__(self):
-        self.rule_engine = RuleEngine()
-        self.neural_engine = NeuralEngine()
+    def __init__(self, rule_engine=None, neural_engine=None, latency_budget=2.0, executor=None,
+                 mode='parallel', cascade_confidence=0.75, cascade_margin=0.15):
+        if rule_engine is None:
+            from services.rule_engine import RuleEngine
+            rule_engine = RuleEngine()
+        if neural_engine is None:
+            from services.neural_engine import NeuralEngine
+            neural_engine = NeuralEngine()
+
+        self.rule_engine = rule_engine
+        self.neural_engine = neural_engine
+        self.executor = executor or get_executor()
+        self.latency_budget = latency_budget
+
+        self.mode = mode
+        self.cascade_confidence = cascade_confidence
+        self.cascade_margin = cascade_margin
+
+        self.path_counts = Counter()
+        self._counts_lock = threading.Lock()
     
-    def process(self, query, processed_data=None):
-        try:
-            rule_results = self.rule_engine.process(query, processed_data=processed_data)
-        except Exception as e:
-            rule_results = []
-        
+    def process(self, query, processed_data=None, latency_budget=None):
+        results, _ = self.process_timed(query, processed_data=processed_data, latency_budget=latency_budget)
+        return results
+
+    def process_timed(self, query, processed_data=None, latency_budget=None):
+        if latency_budget is None:
+            latency_budget = self.latency_budget
+
+        start = time.perf_counter()
+        timings = {}
+
+        if self.mode == 'cascade':
+            rule_results, timings['rule'] = self._timed(self.rule_engine, query, processed_data)
+            if self._rules_are_decisive(rule_results):
+                self._count('rules_only')
+                neural_future = None
+            else:
+                self._count('rules_then_neural')
+                neural_future = self.executor.submit(self._timed, self.neural_engine, query, processed_data)
+        else:
+            self._count('parallel')
+            neural_future = self.executor.submit(self._timed, self.neural_engine, query, processed_data)
+            rule_results, timings['rule'] = self._timed(self.rule_engine, query, processed_data)
+
+        partial = False
+        neural_results = []
+
+        if neural_future is not None:
+            remaining = None
+            if latency_budget is not None:
+                remaining = max(0.0, latency_budget - (time.perf_counter() - start))
+
+            try:
+                neural_results, timings['neural'] = neural_future.result(timeout=remaining)
+            except TimeoutError:
+                neural_future.cancel()
+                partial = True
+                timings['neural'] = None
+                self._count('neural_timeout')
+
+        timings['total'] = time.perf_counter() - start
+
+        response = self._build_response(query, rule_results, neural_results)
+
+        if partial:
+            if isinstance(response, list):
+                response = {'results': response}
+            response['partial'] = True
+            response['partial_message'] = "Semantic matching did not finish in time; showing rule-based results only."
+
+        return response, timings
+
+    def _rules_are_decisive(self, rule_results):
+        if not rule_results:
+            return False
+
+        confidences = sorted((min(1.0, result['confidence'] / 20.0) for result in rule_results), reverse=True)
+        top_confidence = confidences[0]
+        margin = top_confidence - confidences[1] if len(confidences) > 1 else top_confidence
+
+        return top_confidence >= self.cascade_confidence and margin >= self.cascade_margin
+
+    def _count(self, path):
+        with self._counts_lock:
+            self.path_counts[path] += 1
+
+    def stats(self):
+        with self._counts_lock:
+            return dict(self.path_counts)
+
+    def _timed(self, engine, query, processed_data):
+        # Results are never truncated per engine: unknown-query detection averages
+        # over all of them and _combine_results boosts faults found by both, so the
+        # only cut is the final top 5 after combining.
+        start = time.perf_counter()
         try:
-            neural_results = self.neural_engine.process(query, processed_data=processed_data)
-        except Exception as e:
-            neural_results = []
-        
+            results = engine.process(query, processed_data=processed_data)
+        except Exception:
+            # Fall back to no results from this engine, but keep the failure visible
+            logger.exception("%s failed for query %r", type(engine).__name__, query)
+            self._count(f'{type(engine).__name__}_error')
+            results = []
+        return results, time.perf_counter() - start
+
+    def _build_response(self, query, rule_results, neural_results):
         unknown_detection = self._detect_unknown_query(query, rule_results, neural_results)
         
         if unknown_detection['is_unknown']:
@@ -149,27 +246,21 @@ class HybridEngine:
         return {'is_unknown': False}
     
     def _combine_results(self, rule_results, neural_results):
-        normalized_rule_results = []
+        # Engines build fresh result dicts on every call, so they are normalised in place
         for result in rule_results:
-            normalized_result = result.copy()
-            normalized_confidence = min(1.0, result['confidence'] / 20.0)
-            normalized_result['confidence'] = normalized_confidence
-            normalized_result['source'] = 'rule_engine_hybrid'
-            normalized_rule_results.append(normalized_result)
+            result['confidence'] = min(1.0, result['confidence'] / 20.0)
+            result['source'] = 'rule_engine_hybrid'
         
-        normalized_neural_results = []
         for result in neural_results:
-            normalized_result = result.copy()
-            normalized_result['source'] = 'neural_engine_hybrid'
-            normalized_neural_results.append(normalized_result)
+            result['source'] = 'neural_engine_hybrid'
         
         combined_dict = {}
         
-        for result in normalized_rule_results:
+        for result in rule_results:
             fault_name = result['fault']
             combined_dict[fault_name] = result
             
-        for result in normalized_neural_results:
+        for result in neural_results:
             fault_name = result['fault']
             
             if fault_name not in combined_dict:
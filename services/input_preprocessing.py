@@ -1,17 +1,21 @@
 import re
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
-from symspellpy import SymSpell, Verbosity
-import pkg_resources
+import os
+import json
+import hashlib
+import threading
+from itertools import islice
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from utils.cache import LRUCache
 
-lemmatizer = WordNetLemmatizer()
+PREPROCESSING_VERSION = '2'
 
-sym_spell = SymSpell(max_dictionary_edit_distance=2, prefix_length=7)
-dictionary_path = pkg_resources.resource_filename(
-    "symspellpy", "frequency_dictionary_en_82_765.txt")
+SYMSPELL_DICTIONARY_DIR = 'data/symspell'
+TRAIN_DATA_PATH = 'data/train_data.json'
 
-sym_spell.load_dictionary(dictionary_path, term_index=0, count_index=1)
+# When a token is not in the knowledge-base vocabulary, consult the general
+# English dictionary before correcting it, so ordinary words are left alone.
+english_fallback = True
 
 marine_terms = {
     'hfo', 'mdo', 'lshfo', 'lsfo', 'vlsfo', 'mgb', 'mcr', 'rpm', 'turbocharger', 
@@ -33,6 +37,29 @@ domain_terms = marine_terms.union(manufacturer_terms)
 
 unit_pattern = re.compile(r'(\d+)([a-zA-Z]+)')
 range_pattern = re.compile(r'(\d+)-(\d+)([a-zA-Z]+)')
+whitespace_pattern = re.compile(r'\s+')
+vocabulary_word_pattern = re.compile(r"[a-z]+(?:[-'][a-z]+)*")
+
+contractions = {
+    "can't": "cannot",
+    "won't": "will not",
+    "isn't": "is not"
+}
+contraction_pattern = re.compile('|'.join(re.escape(contraction) for contraction in contractions))
+
+negations = {
+    'not ': 'not_',
+    'no ': 'no_',
+    "n't ": 'not_'
+}
+negation_pattern = re.compile(r"(?:not|no|n't) ")
+
+important_stopwords = {'not', 'no', 'nor', 'than', 'too', 'very', 
+                       'against', 'down', 'up', 'over', 'under', 'is', 'has', 'have', 'had'}
+
+spell_cache = LRUCache(max_size=16384)
+lemma_cache = LRUCache(max_size=16384)
+query_cache = LRUCache(max_size=4096)
 
 abbreviations = {
     'temp': 'temperature',
@@ -88,13 +115,189 @@ marine_corrections = {
     'diesal': 'diesel'
 }
 
-for term in domain_terms:
-    sym_spell.create_dictionary_entry(term, 1000)
+# NLTK and SymSpell are slow to import and load, so they are only pulled in by
+# the first query that needs them rather than when the services package loads.
+_nltk = None
+_sym_spell = None
+_domain_sym_spell = None
+_domain_version = None
+_load_lock = threading.Lock()
+
+
+def get_nltk():
+    global _nltk
+    if _nltk is None:
+        with _load_lock:
+            if _nltk is None:
+                from nltk.corpus import stopwords
+                from nltk.tokenize import word_tokenize
+                from nltk.stem import WordNetLemmatizer
+
+                _nltk = {
+                    'stop_words': set(stopwords.words('english')) - important_stopwords,
+                    'word_tokenize': word_tokenize,
+                    'lemmatizer': WordNetLemmatizer()
+                }
+    return _nltk
+
+
+def build_domain_vocabulary(knowledge_base=None, train_data_path=TRAIN_DATA_PATH):
+    """
+    Word counts from the fault trees (names, symptoms, causes, checks and
+    actions) and the training queries, plus the marine terms, abbreviations
+    and stopwords, which must never be "corrected".
+    """
+    if knowledge_base is None:
+        from utils.knowledge_base import get_knowledge_base
+        knowledge_base = get_knowledge_base()
+
+    texts = []
+    for fault in knowledge_base.faults:
+        tree = fault['fault']
+        texts.append(tree.get('name') or '')
+        texts.extend(tree.get('symptoms', []))
+        texts.extend(tree.get('actions', []))
+        for cause in tree.get('causes', []):
+            texts.append(cause.get('name') or '')
+            texts.extend(cause.get('checks', []))
+            texts.extend(cause.get('actions', []))
+
+    try:
+        with open(train_data_path, 'r') as f:
+            train_data = json.load(f)
+    except (OSError, ValueError):
+        train_data = []
+
+    for example in train_data:
+        texts.append(example.get('query', ''))
+        texts.extend(example.get('similar_queries', []))
+
+    texts.extend(abbreviations.values())
+    texts.extend(marine_corrections.values())
+
+    vocabulary = Counter()
+    for text in texts:
+        vocabulary.update(vocabulary_word_pattern.findall(str(text).lower()))
+
+    for term in domain_terms.union(abbreviations):
+        vocabulary[term] += 1000
+    for word in get_nltk()['stop_words'].union(important_stopwords):
+        vocabulary[word] += 1
+
+    return vocabulary
+
+
+def symspell_dictionary_path(name, terms, directory=SYMSPELL_DICTIONARY_DIR):
+    digest = hashlib.sha1()
+    for term in sorted(terms):
+        digest.update(f'{term}\0'.encode('utf-8'))
+    return os.path.join(directory, f'symspell_{name}_{digest.hexdigest()[:12]}.pickle')
+
+
+def english_dictionary_path(directory=SYMSPELL_DICTIONARY_DIR):
+    return symspell_dictionary_path('english', domain_terms.union(marine_corrections.values()), directory)
+
+
+def domain_dictionary_path(vocabulary, directory=SYMSPELL_DICTIONARY_DIR):
+    return symspell_dictionary_path('domain', (f'{word} {count}' for word, count in vocabulary.items()), directory)
+
+
+def build_sym_spell():
+    from importlib.resources import files
+    from symspellpy import SymSpell
+
+    sym_spell = SymSpell(max_dictionary_edit_distance=2, prefix_length=7)
+    dictionary_path = files("symspellpy") / "frequency_dictionary_en_82_765.txt"
+
+    sym_spell.load_dictionary(str(dictionary_path), term_index=0, count_index=1)
+
+    for term in domain_terms:
+        sym_spell.create_dictionary_entry(term, 1000)
+
+    for misspelled, correct in marine_corrections.items():
+        sym_spell.create_dictionary_entry(correct, 1000)
+
+    return sym_spell
+
+
+def build_domain_sym_spell(vocabulary):
+    from symspellpy import SymSpell
+
+    sym_spell = SymSpell(max_dictionary_edit_distance=2, prefix_length=7)
+    for word, count in vocabulary.items():
+        sym_spell.create_dictionary_entry(word, count)
 
-for misspelled, correct in marine_corrections.items():
-    sym_spell.create_dictionary_entry(correct, 1000)
+    return sym_spell
+
+
+def save_sym_spell(sym_spell, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    sym_spell.save_pickle(path + '.tmp', compressed=False)
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def load_sym_spell(path, build):
+    from symspellpy import SymSpell
+
+    sym_spell = SymSpell(max_dictionary_edit_distance=2, prefix_length=7)
+    try:
+        loaded = sym_spell.load_pickle(path, compressed=False)
+    except (OSError, ValueError, EOFError):
+        loaded = False
+
+    if not loaded:
+        sym_spell = build()
+        try:
+            save_sym_spell(sym_spell, path)
+        except OSError:
+            pass
+    return sym_spell
+
+
+def get_sym_spell():
+    global _sym_spell
+    if _sym_spell is None:
+        with _load_lock:
+            if _sym_spell is None:
+                _sym_spell = load_sym_spell(english_dictionary_path(), build_sym_spell)
+    return _sym_spell
+
+
+def get_domain_sym_spell():
+    global _domain_sym_spell, _domain_version
+    from utils.knowledge_base import get_knowledge_base
+
+    knowledge_base = get_knowledge_base()
+    snapshot = knowledge_base.snapshot
+    if _domain_sym_spell is None or _domain_version != snapshot.version:
+        vocabulary = build_domain_vocabulary(snapshot)
+        with _load_lock:
+            if _domain_sym_spell is None or _domain_version != snapshot.version:
+                _domain_sym_spell = load_sym_spell(
+                    domain_dictionary_path(vocabulary),
+                    lambda: build_domain_sym_spell(vocabulary)
+                )
+                _domain_version = snapshot.version
+                spell_cache.clear()
+                query_cache.clear()
+    return _domain_sym_spell
+
+
+def set_english_fallback(enabled):
+    global english_fallback
+    english_fallback = enabled
+    spell_cache.clear()
+    query_cache.clear()
 
 def spell_correct_word(word):
+    corrected = spell_cache.get(word)
+    if corrected is None:
+        corrected = _spell_correct_word(word)
+        spell_cache.set(word, corrected)
+    return corrected
+
+def _spell_correct_word(word):
     if (word in domain_terms or 
         len(word) <= 2 or 
         word.isdigit() or 
@@ -110,53 +313,123 @@ def spell_correct_word(word):
     if word == "doesnt":
         return "does not"
     
-    suggestions = sym_spell.lookup(word, Verbosity.CLOSEST, max_edit_distance=2)
-    if suggestions and suggestions[0].distance <= 2:
+    from symspellpy import Verbosity
+
+    suggestions = get_domain_sym_spell().lookup(word, Verbosity.CLOSEST, max_edit_distance=2)
+    if suggestions and suggestions[0].distance == 0:
+        return word
+
+    if english_fallback:
+        english_suggestions = get_sym_spell().lookup(word, Verbosity.CLOSEST, max_edit_distance=2)
+        if english_suggestions and english_suggestions[0].distance == 0:
+            return word
+        if not suggestions:
+            suggestions = english_suggestions
+
+    if suggestions:
         return suggestions[0].term
     return word
 
+def lemmatize_word(word):
+    lemma = lemma_cache.get(word)
+    if lemma is None:
+        lemma = get_nltk()['lemmatizer'].lemmatize(word)
+        lemma_cache.set(word, lemma)
+    return lemma
+
 def preprocess_user_query(query):
+    # Rebuilds the vocabulary and drops cached results if the knowledge base changed
+    get_domain_sym_spell()
+
+    result = query_cache.get(query)
+    if result is None:
+        result = _preprocess_user_query(query)
+        query_cache.set(query, result)
+    return result
+
+def _preprocess_user_query(query):
 
     text = query.lower()
 
     text = unit_pattern.sub(r'\1 \2', text)
     text = range_pattern.sub(r'\1-\2 \3', text)
 
-    text = re.sub(r'\s+', ' ', text)
+    text = whitespace_pattern.sub(' ', text)
 
-    text = text.replace("can't", "cannot")
-    text = text.replace("won't", "will not")
-    text = text.replace("isn't", "is not")
+    text = contraction_pattern.sub(lambda match: contractions[match.group()], text)
 
-    tokens = word_tokenize(text)
+    nltk = get_nltk()
+    stop_words = nltk['stop_words']
 
-    corrected_tokens = [spell_correct_word(token) for token in tokens]
+    tokens = nltk['word_tokenize'](text)
 
     expanded_tokens = []
-    for token in corrected_tokens:
+    for token in tokens:
+        token = spell_correct_word(token)
         if token in abbreviations:
-            expanded = abbreviations[token].split()
-            expanded_tokens.extend(expanded)
+            expanded_tokens.extend(abbreviations[token].split())
         else:
             expanded_tokens.append(token)
     
-    important_stopwords = {'not', 'no', 'nor', 'than', 'too', 'very', 
-                         'against', 'down', 'up', 'over', 'under', 'is', 'has', 'have', 'had'}
-    stop_words = set(stopwords.words('english')) - important_stopwords
-    
-    filtered_tokens = [token for token in expanded_tokens if token not in stop_words]
-
-    lemmatized_tokens = [lemmatizer.lemmatize(token) for token in filtered_tokens]
+    lemmatized_tokens = [lemmatize_word(token) for token in expanded_tokens if token not in stop_words]
     
     processed_query = ' '.join(lemmatized_tokens)
 
-    processed_query = processed_query.replace("not ", "not_")
-    processed_query = processed_query.replace("no ", "no_")
-    processed_query = processed_query.replace("n't ", "not_")
+    processed_query = negation_pattern.sub(lambda match: negations[match.group()], processed_query)
     
     return processed_query, text
 
 
+def _init_preprocessing_worker(use_english_fallback):
+    global english_fallback
+    english_fallback = use_english_fallback
+
+    get_nltk()
+    get_domain_sym_spell()
+    if use_english_fallback:
+        get_sym_spell()
+
+
+def _preprocess_chunk(queries):
+    return [preprocess_user_query(query) for query in queries]
+
+
+def preprocess_many(queries, workers=None, chunksize=256):
+    """
+    Yield the preprocess_user_query() tuple for each query, in input order.
+    With workers > 1 chunks are spread over a process pool whose workers load
+    NLTK and SymSpell once each; only a few chunks per worker are in flight at
+    a time, so queries can be a lazy iterable of any length.
+    """
+    if not workers or workers <= 1:
+        for query in queries:
+            yield preprocess_user_query(query)
+        return
+
+    queries = iter(queries)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_preprocessing_worker,
+        initargs=(english_fallback,)
+    ) as executor:
+        pending = deque()
+        for chunk in iter(lambda: list(islice(queries, chunksize)), []):
+            pending.append(executor.submit(_preprocess_chunk, chunk))
+            if len(pending) >= workers * 4:
+                yield from pending.popleft().result()
+
+        while pending:
+            yield from pending.popleft().result()
+
+
+def preprocessing_stats():
+    return {
+        'queries': query_cache.stats(),
+        'spelling': spell_cache.stats(),
+        'lemmas': lemma_cache.stats()
+    }
+
+
 def add_missing_context(processed_query, conversation_state=None):
     """
     Analyze query and determine if clarification is needed for engine, component, or problem type.
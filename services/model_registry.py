@@ -0,0 +1,52 @@
+import threading
+from utils.embedding_store import EmbeddingStore, EMBEDDINGS_DIR
+
+MODEL_PATH = 'transformer/marine_miniLM'
+
+
+class ModelRegistry:
+    def __init__(self, model_path=MODEL_PATH, embeddings_path=EMBEDDINGS_DIR):
+        self.model_path = model_path
+        self.embeddings_path = embeddings_path
+        self._model = None
+        self._embedding_store = None
+        self._lock = threading.Lock()
+
+    def get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.model_path)
+        return self._model
+
+    def get_embedding_store(self):
+        if self._embedding_store is None:
+            with self._lock:
+                if self._embedding_store is None:
+                    self._embedding_store = EmbeddingStore(self.embeddings_path)
+        return self._embedding_store
+
+    def reload_embeddings(self):
+        embedding_store = EmbeddingStore(self.embeddings_path)
+        with self._lock:
+            self._embedding_store = embedding_store
+        return embedding_store
+
+    def warmup(self):
+        self.get_embedding_store()
+        model = self.get_model()
+        model.encode("main engine", convert_to_numpy=True)
+
+
+_model_registry = None
+_model_registry_lock = threading.Lock()
+
+
+def get_model_registry():
+    global _model_registry
+    if _model_registry is None:
+        with _model_registry_lock:
+            if _model_registry is None:
+                _model_registry = ModelRegistry()
+    return _model_registry
@@ -1,60 +1,90 @@
-import pickle
-from sentence_transformers import SentenceTransformer, util
-from services.input_preprocessing import preprocess_user_query
+import numpy as np
+from services.input_preprocessing import preprocess_user_query, PREPROCESSING_VERSION
+from services.model_registry import get_model_registry
+from utils.embedding_store import normalize_rows
+from utils.knowledge_base import get_knowledge_base
+from utils.cache import LRUCache
 
 class NeuralEngine:
-    def __init__(self):
-        self.model = SentenceTransformer('transformer/marine_miniLM')
-        
-        try:
-            with open('data/embeddings/fault_embeddings.pkl', 'rb') as f:
-                self.fault_embeddings = pickle.load(f)
-        except FileNotFoundError:
-            raise FileNotFoundError("Embeddings file not found. Please run: python embedding_generator.py")
-    
-    def process(self, query, processed_data=None):
+    def __init__(self, knowledge_base=None, registry=None, query_cache_size=2048, query_cache_ttl=None):
+        self.knowledge_base = knowledge_base or get_knowledge_base()
+        self.registry = registry or get_model_registry()
+        self.similarity_threshold = 0.3
+        self.query_cache = LRUCache(max_size=query_cache_size, ttl=query_cache_ttl)
+
+    @property
+    def model(self):
+        return self.registry.get_model()
+
+    @property
+    def embedding_store(self):
+        return self.registry.get_embedding_store()
+
+    def _encode_query(self, processed_query):
+        cache_key = (processed_query, self.registry.model_path, PREPROCESSING_VERSION)
+        query_embedding = self.query_cache.get(cache_key)
+        if query_embedding is None:
+            query_embedding = self.model.encode(processed_query, convert_to_numpy=True)
+            query_embedding = normalize_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+            query_embedding.setflags(write=False)
+            self.query_cache.set(cache_key, query_embedding)
+        return query_embedding
+
+    def process(self, query, processed_data=None, k=None):
         if processed_data and processed_data.get('enhanced_query'):
             processed_query = processed_data['enhanced_query']
         else:
             processed_query, _ = preprocess_user_query(query)
-        
+
         target_subsystem = None
         query_lower = processed_query.lower()
-        
+
         if 'main engine' in query_lower or 'main' in query_lower:
             target_subsystem = 'main_engine'
         elif any(term in query_lower for term in ['auxiliary engine', 'aux engine', 'auxiliary', 'aux', 'generator', 'gen', 'genset']):
             target_subsystem = 'auxiliary_engine'
-        
-        query_embedding = self.model.encode(processed_query, convert_to_tensor=True)
-        
+
+        store = self.embedding_store
+        snapshot = self.knowledge_base.snapshot
+
+        query_embedding = self._encode_query(processed_query)
+
+        rows = store.rows_for(target_subsystem)
+        if rows is None:
+            similarities = store.matrix @ query_embedding
+            rows = np.arange(len(similarities))
+        else:
+            similarities = store.matrix[rows] @ query_embedding
+
+        above_threshold = similarities > self.similarity_threshold
+        rows = rows[above_threshold]
+        similarities = similarities[above_threshold]
+
+        if k is not None and k < len(similarities):
+            top = np.argpartition(-similarities, k - 1)[:k]
+            rows = rows[top]
+            similarities = similarities[top]
+
+        order = np.argsort(-similarities, kind='stable')
+
         results = []
-        for name, data in self.fault_embeddings.items():
-            fault_subsystem = data.get('subsystem', '')
-            
-            if target_subsystem and fault_subsystem:
-                if target_subsystem != fault_subsystem:
-                    continue
-            
-            fault_embedding = data['embedding']
-            if not hasattr(fault_embedding, 'shape'):
-                import torch
-                fault_embedding = torch.tensor(fault_embedding)
-            
-            similarity = util.pytorch_cos_sim(query_embedding, fault_embedding).item()
-            
-            if similarity > 0.3:
-                results.append({
-                    'fault': name,
-                    'confidence': float(similarity),
-                    'causes': data['fault']['fault'].get('causes', []),
-                    'actions': data['fault']['fault'].get('actions', []),
-                    'symptoms': data['fault']['fault'].get('symptoms', []),
-                    'source': 'neural_engine',
-                    'source_file': data['fault'].get('_source_file', 'unknown'),
-                    'fault_number': data['fault'].get('_fault_number', 0),
-                    'subsystem': fault_subsystem
-                })
-        
-        results.sort(key=lambda x: x['confidence'], reverse=True)
-        return results
\ No newline at end of file
+        for row, similarity in zip(rows[order], similarities[order]):
+            fault = store.fault_for(row, snapshot)
+            if fault is None:
+                continue
+
+            name = store.fault_names[row]
+            results.append({
+                'fault_id': fault.get('_id'),
+                'fault': name,
+                'confidence': float(similarity),
+                'causes': fault['fault'].get('causes', []),
+                'actions': fault['fault'].get('actions', []),
+                'symptoms': fault['fault'].get('symptoms', []),
+                'source': 'neural_engine',
+                'source_file': fault.get('_source_file', 'unknown'),
+                'fault_number': fault.get('_fault_number', 0),
+                'subsystem': store.fault_subsystems[row]
+            })
+
+        return results
@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta
+
+MAX_CHAIN_DEPTH = 10
+
+HISTORY_FIELDS = (
+    'id', 'query_uuid', 'text', 'timestamp', 'clarification_requested', 'clarification_type',
+    'processed_text', 'enhanced_text', 'engine_type', 'parent_query_id'
+)
+
+
+def query_to_dict(query):
+    data = {field: getattr(query, field) for field in HISTORY_FIELDS}
+    data['timestamp'] = query.timestamp.isoformat() if query.timestamp else None
+    return data
+
+
+def encode_cursor(query):
+    return f"{query.timestamp.isoformat()},{query.id}"
+
+
+def decode_cursor(cursor):
+    timestamp, query_id = cursor.rsplit(',', 1)
+    return datetime.fromisoformat(timestamp), int(query_id)
+
+
+def query_chains(session, queries):
+    """
+    Ancestors of each query through parent_query_id, oldest first, fetched
+    with one recursive query for the whole page.
+    """
+    from sqlalchemy import select, literal
+    from sqlalchemy.orm import aliased
+    from models import Query
+
+    child_ids = [query.id for query in queries if query.parent_query_id]
+    if not child_ids:
+        return {}
+
+    chain = (
+        select(Query.id.label('child_id'), Query.parent_query_id.label('ancestor_id'), literal(1).label('depth'))
+        .where(Query.id.in_(child_ids))
+        .cte('chain', recursive=True)
+    )
+    parent = aliased(Query)
+    chain = chain.union_all(
+        select(chain.c.child_id, parent.parent_query_id, chain.c.depth + 1)
+        .join(parent, parent.id == chain.c.ancestor_id)
+        .where(parent.parent_query_id.is_not(None), chain.c.depth < MAX_CHAIN_DEPTH)
+    )
+
+    rows = session.execute(
+        select(chain.c.child_id, chain.c.depth, Query).join(Query, Query.id == chain.c.ancestor_id)
+    ).all()
+
+    ancestors = {}
+    for child_id, depth, ancestor in rows:
+        ancestors.setdefault(child_id, []).append((depth, ancestor))
+
+    return {
+        child_id: [query_to_dict(ancestor) for _, ancestor in sorted(items, key=lambda item: item[0], reverse=True)]
+        for child_id, items in ancestors.items()
+    }
+
+
+def query_history(session, limit=50, cursor=None, engine_type=None, clarification_type=None):
+    """
+    Newest-first page of logged queries with their clarification chains.
+    Pages are keyed on (timestamp, id), so each one is an index range scan
+    however deep the client has paged.
+    """
+    from sqlalchemy import select, or_, and_
+    from models import Query
+
+    statement = select(Query).where(Query.timestamp.is_not(None))
+    if engine_type:
+        statement = statement.where(Query.engine_type == engine_type)
+    if clarification_type:
+        statement = statement.where(Query.clarification_type == clarification_type)
+    if cursor is not None:
+        timestamp, query_id = cursor
+        statement = statement.where(or_(
+            Query.timestamp < timestamp,
+            and_(Query.timestamp == timestamp, Query.id < query_id)
+        ))
+
+    statement = statement.order_by(Query.timestamp.desc(), Query.id.desc()).limit(limit + 1)
+    queries = session.execute(statement).scalars().all()
+
+    next_cursor = encode_cursor(queries[limit - 1]) if len(queries) > limit else None
+    queries = queries[:limit]
+    chains = query_chains(session, queries)
+
+    results = []
+    for query in queries:
+        data = query_to_dict(query)
+        data['chain'] = chains.get(query.id, [])
+        results.append(data)
+
+    return {'queries': results, 'next_cursor': next_cursor}
+
+
+def archive_queries(session_maker, older_than, batch_size=1000, bucket=timedelta(days=1)):
+    """
+    Move queries with a timestamp before older_than into queries_archive,
+    oldest bucket first and at most batch_size rows per transaction, so the
+    job can run against a live table without long locks.
+    """
+    from sqlalchemy import select, insert, delete, func, literal
+    from models import Query, QueryArchive
+
+    columns = [column.name for column in Query.__table__.columns]
+    moved = 0
+
+    with session_maker() as session:
+        oldest = session.execute(select(func.min(Query.timestamp)).where(Query.timestamp < older_than)).scalar()
+
+    while oldest is not None:
+        bucket_start = datetime.combine(oldest.date(), datetime.min.time())
+        while bucket_start + bucket <= oldest:
+            bucket_start += bucket
+        bucket_end = min(bucket_start + bucket, older_than)
+
+        while True:
+            with session_maker() as session:
+                ids = session.execute(
+                    select(Query.id)
+                    .where(Query.timestamp >= bucket_start, Query.timestamp < bucket_end)
+                    .order_by(Query.timestamp, Query.id)
+                    .limit(batch_size)
+                ).scalars().all()
+                if not ids:
+                    break
+
+                session.execute(insert(QueryArchive).from_select(
+                    columns + ['archived_at'],
+                    select(*Query.__table__.columns, literal(datetime.now()).label('archived_at'))
+                    .where(Query.id.in_(ids))
+                ))
+                session.execute(delete(Query).where(Query.id.in_(ids)))
+                session.commit()
+
+            moved += len(ids)
+            if len(ids) < batch_size:
+                break
+
+        with session_maker() as session:
+            oldest = session.execute(
+                select(func.min(Query.timestamp)).where(Query.timestamp >= bucket_end, Query.timestamp < older_than)
+            ).scalar()
+
+    return moved
@@ -0,0 +1,194 @@
+import time
+import queue
+import threading
+from datetime import datetime
+
+_STOP = object()
+
+QUERY_FIELDS = (
+    'query_uuid', 'parent_query_uuid', 'text', 'timestamp', 'clarification_requested',
+    'clarification_type', 'processed_text', 'enhanced_text', 'engine_type'
+)
+
+
+class QueryLogger:
+    """
+    Write-behind logger for Query rows. log() only enqueues; a background
+    thread bulk-inserts a batch once batch_size rows are waiting or
+    flush_interval seconds have passed since the first one. When the queue is
+    full, log() waits up to put_timeout seconds and then drops the row.
+
+    Rows are linked through client-generated query_uuid values. After each
+    batch, parent_query_id is filled in for the rows whose parent is already
+    in the table. A batch that repeats an already-logged query_uuid is
+    retried row by row, so only the repeated rows are dropped.
+    """
+
+    def __init__(self, session_maker=None, max_queue=10000, batch_size=200, flush_interval=0.5, put_timeout=0.0):
+        self.session_maker = session_maker
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self._counts_lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_error = None
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='query-logger', daemon=True)
+                self._thread.start()
+        return self
+
+    def log(self, query_uuid, text, parent_query_uuid=None, **fields):
+        row = {field: None for field in QUERY_FIELDS}
+        row.update(fields)
+        row.update({
+            'query_uuid': query_uuid,
+            'parent_query_uuid': parent_query_uuid,
+            'text': text,
+            'timestamp': fields.get('timestamp') or datetime.now()
+        })
+
+        try:
+            if self.put_timeout:
+                self._queue.put(row, timeout=self.put_timeout)
+            else:
+                self._queue.put_nowait(row)
+        except queue.Full:
+            self._count('dropped')
+            return False
+
+        self._count('enqueued')
+        return True
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def stats(self):
+        with self._counts_lock:
+            return {
+                'queued': self._queue.qsize(),
+                'enqueued': self.enqueued,
+                'written': self.written,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'batches': self.batches,
+                'last_error': self.last_error
+            }
+
+    def _count(self, name, amount=1):
+        with self._counts_lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.task_done()
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, batch):
+        from sqlalchemy import insert, select, bindparam
+        from sqlalchemy.exc import IntegrityError
+        from models import Query, session_maker as default_session_maker
+
+        if self.session_maker is None:
+            self.session_maker = default_session_maker
+
+        written = batch
+        try:
+            with self.session_maker() as session:
+                try:
+                    session.execute(insert(Query), batch)
+                except IntegrityError:
+                    # A query_uuid that is already logged fails the whole statement;
+                    # retry row by row so only the offending rows are dropped.
+                    session.rollback()
+                    written = []
+                    for row in batch:
+                        try:
+                            session.execute(insert(Query), [row])
+                            session.commit()
+                        except IntegrityError as e:
+                            session.rollback()
+                            with self._counts_lock:
+                                self.failed += 1
+                                self.last_error = str(e)
+                            continue
+                        written.append(row)
+
+                parent_uuids = {
+                    row['parent_query_uuid'] for row in written
+                    if row['parent_query_uuid'] and row['parent_query_uuid'] != row['query_uuid']
+                }
+                if parent_uuids:
+                    parent_ids = dict(session.execute(
+                        select(Query.query_uuid, Query.id).where(Query.query_uuid.in_(parent_uuids))
+                    ).all())
+
+                    links = [
+                        {'child_uuid': row['query_uuid'], 'parent_id': parent_ids[row['parent_query_uuid']]}
+                        for row in written if row['parent_query_uuid'] in parent_uuids
+                        and row['parent_query_uuid'] in parent_ids
+                    ]
+                    if links:
+                        table = Query.__table__
+                        session.connection().execute(
+                            table.update()
+                            .where(table.c.query_uuid == bindparam('child_uuid'))
+                            .values(parent_query_id=bindparam('parent_id')),
+                            links
+                        )
+
+                session.commit()
+        except Exception as e:
+            with self._counts_lock:
+                self.last_error = str(e)
+                if written is batch:
+                    self.failed += len(batch)
+                    return
+                # rows inserted one at a time are already committed; only
+                # their parent links were lost
+                self.written += len(written)
+                self.batches += 1
+            return
+
+        with self._counts_lock:
+            self.written += len(written)
+            self.batches += 1
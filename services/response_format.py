@@ -0,0 +1,14 @@
+COMPACT_FIELDS = ('fault_id', 'fault', 'confidence', 'source', 'subsystem')
+
+
+def compact_result(result):
+    return {field: result.get(field) for field in COMPACT_FIELDS}
+
+
+def compact_response(response):
+    if isinstance(response, list):
+        return [compact_result(result) for result in response]
+
+    compacted = dict(response)
+    compacted['results'] = [compact_result(result) for result in response.get('results', [])]
+    return compacted
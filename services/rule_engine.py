@@ -1,9 +1,172 @@
-from utils.yaml_parser import YamlReader
-from models.DB_class import session_maker
+import heapq
+from bisect import bisect_right
+from utils.knowledge_base import get_knowledge_base
+from utils.term_matcher import TermMatcher
+
+
+def mask_bits(mask):
+    bit = 0
+    while mask:
+        if mask & 1:
+            yield bit
+        mask >>= 1
+        bit += 1
+
+
+class TermScan:
+    __slots__ = ('matches', 'files', 'category_mask', 'important_terms', 'indicators')
+
+    def __init__(self, matches):
+        self.matches = matches
+        self.files = set()
+        self.category_mask = 0
+        self.important_terms = {}
+        self.indicators = set()
+
+        for match in matches:
+            for kind, value in match.payloads:
+                if kind == 'file':
+                    self.files.update(value)
+                elif kind == 'category':
+                    self.category_mask |= value
+                elif kind == 'important':
+                    self.important_terms[match.term] = value
+                else:
+                    self.indicators.add(value)
+
+
+class FaultFeatures:
+    __slots__ = (
+        'fault_id', 'fault', 'name', 'name_words', 'symptoms', 'symptom_words', 'text',
+        'category_mask', 'has_high', 'has_low', 'has_specific', 'has_general',
+        'has_cylinder', 'important_terms'
+    )
+
+    def __init__(self, fault_id, fault, engine):
+        self.fault_id = fault_id
+        self.fault = fault
+        self.name = fault['fault'].get('name', '').lower()
+        self.name_words = set(self.name.split())
+        self.symptoms = [s.lower() for s in fault['fault'].get('symptoms', [])]
+        self.symptom_words = [set(symptom.split()) for symptom in self.symptoms]
+        self.text = self.name + " " + " ".join(self.symptoms)
+
+        text_scan = engine.scan(self.text)
+        self.category_mask = text_scan.category_mask
+        self.important_terms = frozenset(text_scan.important_terms)
+
+        name_indicators = engine.scan(self.name).indicators
+        self.has_high = 'fault_high' in name_indicators
+        self.has_low = 'fault_low' in name_indicators
+        self.has_specific = 'fault_specific' in name_indicators
+        self.has_general = 'fault_general' in name_indicators
+        self.has_cylinder = 'cylinder' in name_indicators
+
+    def index_keys(self):
+        keys = {('word', word) for word in self.name_words}
+        for symptom_words in self.symptom_words:
+            keys.update(('word', word) for word in symptom_words)
+        keys.update(('term', term) for term in self.important_terms)
+        keys.update(('category', bit) for bit in mask_bits(self.category_mask))
+        if self.has_high:
+            keys.add(('direction', 'high'))
+        if self.has_low:
+            keys.add(('direction', 'low'))
+        return keys
+
+
+class RuleSegment:
+    """
+    Scoring features for one knowledge-base file plus the indexes used to
+    find every fault that can score above zero for a query: shared words,
+    important terms, symptom categories and opposite direction indicators
+    through `token_index`, and whole-string containment between the query
+    and a fault name or symptom through `phrase_matcher` and `text`.
+    """
+
+    __slots__ = ('faults', 'features', 'token_index', 'phrase_matcher', 'text', 'text_offsets', 'unindexed')
+
+    def __init__(self, faults, engine):
+        self.faults = faults
+        self.features = []
+        self.token_index = {}
+        self.phrase_matcher = TermMatcher()
+        self.text_offsets = []
+        self.unindexed = set()
+
+        texts = []
+        offset = 0
+        for fault in faults:
+            if 'fault' not in fault:
+                continue
+
+            features = FaultFeatures(len(self.features), fault, engine)
+            self.features.append(features)
+            for key in features.index_keys():
+                self.token_index.setdefault(key, set()).add(features.fault_id)
+
+            for phrase in [features.name] + features.symptoms:
+                if phrase:
+                    self.phrase_matcher.add(phrase, 'fault', features.fault_id)
+                else:
+                    self.unindexed.add(features.fault_id)
+
+            texts.append(features.text)
+            self.text_offsets.append(offset)
+            offset += len(features.text) + 1
+
+        self.phrase_matcher.build()
+        self.text = '\n'.join(texts)
+
+    def containing(self, query_lower):
+        if not query_lower:
+            return set(range(len(self.features)))
+
+        fault_ids = set()
+        position = self.text.find(query_lower)
+        while position != -1:
+            fault_ids.add(bisect_right(self.text_offsets, position) - 1)
+            position = self.text.find(query_lower, position + 1)
+        return fault_ids
+
+    def contained(self, query_lower):
+        return {value for match in self.phrase_matcher.find(query_lower) for _, value in match.payloads}
+
+
+class QueryFeatures:
+    __slots__ = (
+        'text', 'words', 'category_mask', 'has_high', 'has_low',
+        'has_specific', 'has_general', 'has_cylinder', 'important_terms'
+    )
+
+    def __init__(self, query_lower, query_words, query_scan):
+        self.text = query_lower
+        self.words = query_words
+        self.category_mask = query_scan.category_mask
+        self.important_terms = query_scan.important_terms
+
+        indicators = query_scan.indicators
+        self.has_high = 'query_high' in indicators
+        self.has_low = 'query_low' in indicators
+        self.has_specific = 'query_specific' in indicators
+        self.has_general = 'query_general' in indicators
+        self.has_cylinder = 'cylinder' in indicators
+
+    def index_keys(self):
+        keys = {('word', word) for word in self.words}
+        keys.update(('term', term) for term in self.important_terms)
+        keys.update(('category', bit) for bit in mask_bits(self.category_mask))
+        # a fault pointing the other way still scores the directional-mismatch floor
+        if self.has_high:
+            keys.add(('direction', 'low'))
+        if self.has_low:
+            keys.add(('direction', 'high'))
+        return keys
+
 
 class RuleEngine:
-    def __init__(self):
-        self.session_maker = session_maker
+    def __init__(self, knowledge_base=None):
+        self.knowledge_base = knowledge_base or get_knowledge_base()
 
         self.file_mappings = {
             'temperature': ['temperatures.yaml'],
@@ -102,7 +265,88 @@ class RuleEngine:
             'leaking': 8
         }
 
-    def process(self, query, processed_data=None):
+        self.query_high_indicators = ['high', 'above', 'elevated', 'too hot', 'hot', 'increase', 'rise']
+        self.query_low_indicators = ['low', 'below', 'cold', 'lacking', 'decrease', 'drop', 'insufficient']
+
+        self.fault_high_indicators = ['high', 'above', 'elevated', 'increase', 'rise']
+        self.fault_low_indicators = ['low', 'below', 'lacking', 'decrease', 'drop', 'insufficient']
+
+        self.query_specific_indicators = ['one', 'single', 'individual', 'specific']
+        self.query_general_indicators = ['all', 'every', 'multiple', 'general']
+
+        self.fault_specific_indicators = ['one', 'single', 'individual']
+        self.fault_general_indicators = ['all', 'every', 'multiple']
+
+        self.term_matcher = self._build_term_matcher()
+        self.knowledge_base.register_compiler(self, self._compile_segments)
+
+    def _build_term_matcher(self):
+        matcher = TermMatcher()
+
+        for term, files in self.file_mappings.items():
+            matcher.add(term, 'file', files)
+
+        for bit, terms in enumerate(self.symptom_categories.values()):
+            for term in terms:
+                matcher.add(term, 'category', 1 << bit)
+
+        for term, boost in self.important_terms.items():
+            matcher.add(term, 'important', boost)
+
+        indicators = {
+            'query_high': self.query_high_indicators,
+            'query_low': self.query_low_indicators,
+            'fault_high': self.fault_high_indicators,
+            'fault_low': self.fault_low_indicators,
+            'query_specific': self.query_specific_indicators,
+            'query_general': self.query_general_indicators,
+            'fault_specific': self.fault_specific_indicators,
+            'fault_general': self.fault_general_indicators,
+            'cylinder': ['cylinder']
+        }
+        for indicator, terms in indicators.items():
+            for term in terms:
+                matcher.add(term, 'indicator', indicator)
+
+        matcher.build()
+        return matcher
+
+    def scan(self, text):
+        return TermScan(self.term_matcher.find(text))
+
+    def _compile_segments(self, snapshot, previous=None):
+        previous_segments = previous.derived.get(self, {}) if previous is not None else {}
+
+        segments = {}
+        for subsystem, files in snapshot.tree.items():
+            for filename, faults in files.items():
+                segment = previous_segments.get((subsystem, filename))
+                if segment is None or segment.faults is not faults:
+                    segment = RuleSegment(faults, self)
+                segments[(subsystem, filename)] = segment
+        return segments
+
+    def _find_candidates(self, query_features, segments, file_keys):
+        query_keys = query_features.index_keys()
+
+        candidates = []
+        for file_key in file_keys:
+            segment = segments.get(file_key)
+            if segment is None:
+                continue
+
+            candidate_ids = segment.unindexed | segment.contained(query_features.text)
+            candidate_ids |= segment.containing(query_features.text)
+            for key in query_keys:
+                postings = segment.token_index.get(key)
+                if postings:
+                    candidate_ids |= postings
+
+            candidates.extend(segment.features[fault_id] for fault_id in sorted(candidate_ids))
+
+        return candidates
+
+    def process(self, query, processed_data=None, k=None):
         if processed_data and processed_data.get('enhanced_query'):
             query_text = processed_data.get('enhanced_query')
         elif processed_data and processed_data.get('normalized_query'):
@@ -135,98 +379,83 @@ class RuleEngine:
             elif 'auxiliary engine' in query_lower or 'aux engine' in query_lower or 'auxiliary' in query_lower or 'aux' in query_lower:
                 subsystem = 'auxiliary_engines'
 
-        query_categories = self._identify_symptom_categories(query_lower)
-        file_filters = self._get_relevant_files(query_lower)
+        query_scan = self.scan(query_lower)
+        file_filters = self._get_relevant_files(query_scan)
 
-        with self.session_maker() as session:
-            yaml_reader = YamlReader(session)
-            all_faults = yaml_reader.get_all_faults(subsystem=subsystem, file_filters=file_filters)
-        
-        results = []
-        for fault in all_faults:
-            if 'fault' not in fault:
-                continue
-                
-            confidence = self._calculate_overlap(query_lower, query_words, fault, query_categories)
-            
+        query_features = QueryFeatures(query_lower, query_words, query_scan)
+
+        snapshot = self.knowledge_base.snapshot
+        segments = self.knowledge_base.derived(self, snapshot)
+        file_keys = snapshot.select_files(subsystem=subsystem, file_filters=file_filters)
+
+        scored = []
+        for features in self._find_candidates(query_features, segments, file_keys):
+            confidence = self._calculate_overlap(query_features, features)
             if confidence > 0:
-                results.append({
-                    'fault': fault['fault']['name'],
-                    'confidence': confidence,
-                    'source_file': fault.get('_source_file', 'unknown'),
-                    'fault_number': fault.get('_fault_number', 0),
-                    'causes': fault['fault'].get('causes', []),
-                    'source': 'rule_engine',
-                    'subsystem': fault.get('_subsystem', 'unknown')
-                })
-
-        results.sort(key=lambda x: x['confidence'], reverse=True)
-        return results
+                scored.append((confidence, features))
 
-    def _get_relevant_files(self, query):
-        relevant_files = set()
+        if k is None:
+            scored.sort(key=lambda item: item[0], reverse=True)
+        else:
+            scored = heapq.nlargest(k, scored, key=lambda item: item[0])
 
-        for term, files in self.file_mappings.items():
-            if term in query:
-                for file in files:
-                    relevant_files.add(file)
+        results = []
+        for confidence, features in scored:
+            fault = features.fault
+            results.append({
+                'fault_id': fault.get('_id'),
+                'fault': fault['fault']['name'],
+                'confidence': confidence,
+                'source_file': fault.get('_source_file', 'unknown'),
+                'fault_number': fault.get('_fault_number', 0),
+                'causes': fault['fault'].get('causes', []),
+                'source': 'rule_engine',
+                'subsystem': fault.get('_subsystem', 'unknown')
+            })
+
+        return results
+
+    def _get_relevant_files(self, query_scan):
+        relevant_files = set(query_scan.files)
 
         if not relevant_files:
             relevant_files = {'temperatures.yaml', 'pressures.yaml', 'other.yaml'}
             
         return list(relevant_files)
     
-    def _identify_symptom_categories(self, query):
-        categories = []
-        
-        for category, terms in self.symptom_categories.items():
-            if any(term in query for term in terms):
-                categories.append(category)
-                
-        return categories
-
-    def _calculate_overlap(self, query_lower, query_words, fault, query_categories):
-        fault_name = fault['fault'].get('name', '').lower()
-        symptoms = [s.lower() for s in fault['fault'].get('symptoms', [])]
-        
-        directional_mismatch = self._check_directional_mismatch(query_lower, fault_name)
-        specificity_mismatch = self._check_specificity_mismatch(query_lower, fault_name)
-        
-        if directional_mismatch:
+    def _calculate_overlap(self, query, fault):
+        if self._check_directional_mismatch(query, fault):
             return 0.1
 
-        fault_categories = []
-        combined_fault_text = fault_name + " " + " ".join(symptoms)
-        for category, terms in self.symptom_categories.items():
-            if any(term in combined_fault_text for term in terms):
-                fault_categories.append(category)
+        specificity_mismatch = self._check_specificity_mismatch(query, fault)
 
         confidence = 0
-        
-        for term, boost in self.important_terms.items():
-            if term in query_lower and term in combined_fault_text:
+
+        for term in fault.important_terms:
+            boost = query.important_terms.get(term)
+            if boost:
                 confidence += boost
-        
-        category_match = False
-        for category in query_categories:
-            if category in fault_categories:
-                confidence += 5
-                category_match = True
-        
-        if query_lower in fault_name:
+
+        shared_categories = query.category_mask & fault.category_mask
+        category_match = shared_categories != 0
+        confidence += 5 * bin(shared_categories).count('1')
+
+        query_lower = query.text
+        query_words = query.words
+
+        if query_lower in fault.name:
             confidence += 8
-        elif fault_name in query_lower:
+        elif fault.name in query_lower:
             confidence += 6
 
-        fault_name_words = set(fault_name.split())
-        name_overlap = query_words.intersection(fault_name_words)
+        name_overlap = query_words.intersection(fault.name_words)
         if name_overlap:
-            overlap_ratio = len(name_overlap) / max(len(query_words), len(fault_name_words))
+            overlap_ratio = len(name_overlap) / max(len(query_words), len(fault.name_words))
             word_score = 4 * overlap_ratio
             confidence += word_score
 
         symptom_match = False
-        for symptom in symptoms:
+        for symptom, symptom_words in zip(fault.symptoms, fault.symptom_words):
             if query_lower in symptom:
                 confidence += 7
                 symptom_match = True
@@ -236,55 +465,28 @@ class RuleEngine:
                 symptom_match = True
                 break
 
-            symptom_words = set(symptom.split())
             symptom_overlap = query_words.intersection(symptom_words)
             if symptom_overlap and len(symptom_overlap) >= 2:
                 symptom_ratio = len(symptom_overlap) / max(len(query_words), len(symptom_words))
                 symptom_score = 3 * symptom_ratio
                 confidence += symptom_score
                 symptom_match = True
-        
+
         if specificity_mismatch:
             confidence *= 0.5
-        
+
         if not category_match and not symptom_match and confidence < 8:
             confidence *= 0.3
-        
+
         return round(confidence, 2)
-    
-    def _check_directional_mismatch(self, query_lower, fault_name):
-        query_high_indicators = ['high', 'above', 'elevated', 'too hot', 'hot', 'increase', 'rise']
-        query_low_indicators = ['low', 'below', 'cold', 'lacking', 'decrease', 'drop', 'insufficient']
-        
-        fault_high_indicators = ['high', 'above', 'elevated', 'increase', 'rise']
-        fault_low_indicators = ['low', 'below', 'lacking', 'decrease', 'drop', 'insufficient']
-        
-        query_has_high = any(term in query_lower for term in query_high_indicators)
-        query_has_low = any(term in query_lower for term in query_low_indicators)
-        fault_has_high = any(term in fault_name for term in fault_high_indicators)
-        fault_has_low = any(term in fault_name for term in fault_low_indicators)
-        
-        mismatch = ((query_has_high and fault_has_low) or 
-                   (query_has_low and fault_has_high))
-        
-        return mismatch
-    
-    def _check_specificity_mismatch(self, query_lower, fault_name):
-        query_specific_indicators = ['one', 'single', 'individual', 'specific']
-        query_general_indicators = ['all', 'every', 'multiple', 'general']
-        
-        fault_specific_indicators = ['one', 'single', 'individual']
-        fault_general_indicators = ['all', 'every', 'multiple']
-        
-        if 'cylinder' not in query_lower and 'cylinder' not in fault_name:
+
+    def _check_directional_mismatch(self, query, fault):
+        return ((query.has_high and fault.has_low) or
+                (query.has_low and fault.has_high))
+
+    def _check_specificity_mismatch(self, query, fault):
+        if not query.has_cylinder and not fault.has_cylinder:
             return False
-        
-        query_has_specific = any(term in query_lower for term in query_specific_indicators)
-        query_has_general = any(term in query_lower for term in query_general_indicators)
-        fault_has_specific = any(term in fault_name for term in fault_specific_indicators)
-        fault_has_general = any(term in fault_name for term in fault_general_indicators)
-        
-        mismatch = ((query_has_specific and fault_has_general) or 
-                   (query_has_general and fault_has_specific))
-        
-        return mismatch
\ No newline at end of file
+
+        return ((query.has_specific and fault.has_general) or
+                (query.has_general and fault.has_specific))
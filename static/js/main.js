@@ -70,7 +70,8 @@ document.addEventListener('DOMContentLoaded', function() {
             },
             body: JSON.stringify({
                 query: userQuery,
-                engine: selectedEngine
+                engine: selectedEngine,
+                view: 'compact'
             })
         })
         .then(response => response.json())
@@ -85,6 +86,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 // Format and display regular diagnosis response
                 const formattedResponse = formatDiagnosisResponse(data, selectedEngine);
                 addMessage('assistant', formattedResponse);
+                loadFaultDetails();
             }
             
             // Scroll to bottom
@@ -272,7 +274,8 @@ document.addEventListener('DOMContentLoaded', function() {
             },
             body: JSON.stringify({
                 query: clarificationValue,
-                engine: selectedEngine
+                engine: selectedEngine,
+                view: 'compact'
             })
         })
         .then(response => response.json())
@@ -287,6 +290,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 // Format and display diagnosis response
                 const formattedResponse = formatDiagnosisResponse(data, selectedEngine);
                 addMessage('assistant', formattedResponse);
+                loadFaultDetails();
             }
             
             // Scroll to bottom
@@ -327,9 +331,6 @@ document.addEventListener('DOMContentLoaded', function() {
     
     // Format diagnosis response
     function formatDiagnosisResponse(data, engineType) {
-        // Check if data is an array and get the best match (highest confidence)
-        const bestMatch = Array.isArray(data) && data.length > 0 ? data[0] : data;
-        
         // Customize based on your data structure
         let engineLabel = '';
         if (engineType === 'rule') {
@@ -340,6 +341,21 @@ document.addEventListener('DOMContentLoaded', function() {
             engineLabel = '<span class="engine-label hybrid">Hybrid Analysis</span>';
         }
         
+        // The hybrid engine flagged the query as outside the knowledge base
+        if (data.is_unknown_query) {
+            let html = `<p>${engineLabel} ${data.unknown_message || ''}</p>`;
+            if (data.suggestion) {
+                html += `<p>${data.suggestion}</p>`;
+            }
+            return html + renderCauses([]);
+        }
+        
+        // Partial hybrid responses wrap the ranked list in an object with extra flags
+        const results = Array.isArray(data) ? data : (data.partial && Array.isArray(data.results) ? data.results : null);
+        
+        // Get the best match (highest confidence)
+        const bestMatch = results ? (results.length > 0 ? results[0] : null) : data;
+        
         // Add enhanced query information if available
         let queryInfo = '';
         if (data.original_query && data.enhanced_query && data.original_query !== data.enhanced_query) {
@@ -351,15 +367,34 @@ document.addEventListener('DOMContentLoaded', function() {
         
         let html = `<p>${engineLabel} ${queryInfo} Based on your description, I've identified the following issue:</p>`;
         
+        // Neural matching missed the latency budget, so only rule results were used
+        if (data.partial && data.partial_message) {
+            html += `<p class="partial-notice">${data.partial_message}</p>`;
+        }
+        
         if (bestMatch && bestMatch.fault) {
             html += `<h3>${bestMatch.fault}</h3>`;
         }
         
-        if (bestMatch && bestMatch.causes && bestMatch.causes.length > 0) {
+        if (bestMatch && bestMatch.causes) {
+            html += renderCauses(bestMatch.causes);
+        } else if (bestMatch && bestMatch.fault_id) {
+            // Compact responses only carry the fault ID; causes are fetched separately
+            html += `<div class="fault-detail" data-fault-id="${bestMatch.fault_id}"><p>Loading potential causes...</p></div>`;
+        } else {
+            html += renderCauses([]);
+        }
+        
+        return html;
+    }
+    
+    // Render the ranked causes of a fault
+    function renderCauses(causes) {
+        if (causes.length > 0) {
             // Sort causes by probability in descending order (highest probability first)
-            const sortedCauses = [...bestMatch.causes].sort((a, b) => b.probability - a.probability);
+            const sortedCauses = [...causes].sort((a, b) => b.probability - a.probability);
             
-            html += '<p>Potential causes (ranked by probability):</p><ol>';
+            let html = '<p>Potential causes (ranked by probability):</p><ol>';
             sortedCauses.forEach((cause, index) => {
                 const percentage = Math.round(cause.probability * 100);
                 // Add priority class based on probability
@@ -387,12 +422,48 @@ document.addEventListener('DOMContentLoaded', function() {
                         </div>
                     </li>`;
             });
-            html += '</ol>';
-        } else {
-            html += '<p>I couldn\'t identify specific causes for this issue. Please provide more details or try a different description.</p>';
+            return html + '</ol>';
         }
         
-        return html;
+        return '<p>I couldn\'t identify specific causes for this issue. Please provide more details or try a different description.</p>';
+    }
+    
+    // Fault details are cached per page; the endpoint itself is HTTP-cacheable
+    const faultDetailCache = new Map();
+    
+    function fetchFaultDetail(faultId) {
+        if (!faultDetailCache.has(faultId)) {
+            const request = fetch(`/api/fault/${faultId}`)
+                .then(response => {
+                    if (!response.ok) {
+                        throw new Error(`Fault ${faultId} not found`);
+                    }
+                    return response.json();
+                })
+                .catch(error => {
+                    faultDetailCache.delete(faultId);
+                    throw error;
+                });
+            faultDetailCache.set(faultId, request);
+        }
+        return faultDetailCache.get(faultId);
+    }
+    
+    // Fill in every placeholder left by a compact diagnosis response
+    function loadFaultDetails() {
+        document.querySelectorAll('.fault-detail[data-fault-id]').forEach(container => {
+            const faultId = container.dataset.faultId;
+            container.removeAttribute('data-fault-id');
+            
+            fetchFaultDetail(faultId)
+                .then(detail => {
+                    container.innerHTML = renderCauses(detail.causes || []);
+                })
+                .catch(error => {
+                    console.error('Error loading fault details:', error);
+                    container.innerHTML = '<p>Sorry, I couldn\'t load the details for this fault.</p>';
+                });
+        });
     }
     
     // Create and add reset conversation button
@@ -0,0 +1,23 @@
+import sys
+import os
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.DB_class import session_maker
+from services.query_history import archive_queries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old rows from queries into queries_archive.")
+    parser.add_argument('--days', type=int, default=90, help="archive queries older than this many days")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--bucket-hours', type=int, default=24)
+    args = parser.parse_args()
+
+    cutoff = datetime.now() - timedelta(days=args.days)
+    moved = archive_queries(
+        session_maker, cutoff, batch_size=args.batch_size, bucket=timedelta(hours=args.bucket_hours)
+    )
+    print(f"Archived {moved} queries older than {cutoff:%Y-%m-%d %H:%M}")
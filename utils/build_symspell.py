@@ -0,0 +1,90 @@
+import sys
+import os
+import json
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import services.input_preprocessing as preprocessing
+from services.input_preprocessing import (
+    SYMSPELL_DICTIONARY_DIR, TRAIN_DATA_PATH, build_domain_vocabulary, build_domain_sym_spell,
+    build_sym_spell, domain_dictionary_path, english_dictionary_path, save_sym_spell
+)
+
+
+def load_queries(path):
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    queries = []
+    for item in data:
+        if isinstance(item, str):
+            queries.append(item)
+        else:
+            queries.append(item.get('query') or item.get('text') or '')
+            queries.extend(item.get('similar_queries', []))
+    return queries
+
+
+def english_only_correction(sym_spell, word):
+    from symspellpy import Verbosity
+
+    if (word in preprocessing.domain_terms or len(word) <= 2 or
+            any(char.isdigit() for char in word)):
+        return word
+    suggestions = sym_spell.lookup(word, Verbosity.CLOSEST, max_edit_distance=2)
+    return suggestions[0].term if suggestions else word
+
+
+def evaluate(queries, vocabulary, english):
+    tokens = [
+        token for query in queries
+        for token in preprocessing.get_nltk()['word_tokenize'](preprocessing.whitespace_pattern.sub(' ', query.lower()))
+        if token.isalpha()
+    ]
+
+    report = {}
+    for name, correct in (
+        ('english', lambda word: english_only_correction(english, word)),
+        ('domain', preprocessing.spell_correct_word)
+    ):
+        changed = [(token, correct(token)) for token in tokens]
+        changed = [(token, corrected) for token, corrected in changed if corrected != token]
+        report[name] = {
+            'tokens': len(tokens),
+            'changed': len(changed),
+            'domain_words_changed': sum(1 for token, _ in changed if token in vocabulary),
+            'changed_to_domain_word': sum(1 for _, corrected in changed if corrected in vocabulary),
+            'examples': sorted(set(changed))[:20]
+        }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prebuild the serialized SymSpell dictionaries used for spell correction.")
+    parser.add_argument('--output', default=SYMSPELL_DICTIONARY_DIR)
+    parser.add_argument('--train-data', default=TRAIN_DATA_PATH)
+    parser.add_argument('--evaluate', metavar='QUERIES_JSON',
+                        help="compare English-only and domain-first correction on a JSON list of queries")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    vocabulary = build_domain_vocabulary(train_data_path=args.train_data)
+    domain = build_domain_sym_spell(vocabulary)
+    path = save_sym_spell(domain, domain_dictionary_path(vocabulary, args.output))
+    print(f"Wrote {path} ({len(domain.words)} words) in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    english = build_sym_spell()
+    path = save_sym_spell(english, english_dictionary_path(args.output))
+    print(f"Wrote {path} ({len(english.words)} words) in {time.perf_counter() - start:.2f}s")
+
+    if args.evaluate:
+        report = evaluate(load_queries(args.evaluate), vocabulary, english)
+        for name, stats in report.items():
+            print(f"{name}: {stats['changed']}/{stats['tokens']} tokens changed, "
+                  f"{stats['domain_words_changed']} of them knowledge-base words, "
+                  f"{stats['changed_to_domain_word']} corrected to a knowledge-base word")
+            for token, corrected in stats['examples']:
+                print(f"  {token} -> {corrected}")
@@ -0,0 +1,66 @@
+import sys
+import os
+import argparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.knowledge_base import (
+    KNOWLEDGE_BASE_PATH, SNAPSHOT_PATH, KnowledgeBase, read_compiled_snapshot, write_compiled_snapshot
+)
+
+
+def compile_knowledge_base(base_path=KNOWLEDGE_BASE_PATH, output=SNAPSHOT_PATH, force=False):
+    knowledge_base = KnowledgeBase(base_path, snapshot_path=None)
+    snapshot = knowledge_base.snapshot
+
+    errors = snapshot.errors()
+    for error in errors:
+        print(f"ERROR: {error}")
+
+    print(f"Parsed {len(snapshot.faults)} faults from {len(snapshot.sources)} files")
+
+    if errors and not force:
+        print(f"{len(errors)} malformed sections, snapshot not written (use --force to write anyway)")
+        return False
+
+    write_compiled_snapshot(snapshot, output)
+    print(f"Wrote {output} ({snapshot.version})")
+    return True
+
+
+def check_snapshot(base_path=KNOWLEDGE_BASE_PATH, output=SNAPSHOT_PATH):
+    compiled = read_compiled_snapshot(output)
+    if not compiled:
+        print(f"{output} is missing or was written by another format/Python version")
+        return False
+
+    knowledge_base = KnowledgeBase(base_path, snapshot_path=None)
+    current = {key: source.content_hash for key, source in knowledge_base.snapshot.sources.items()}
+    stale = {key: source.content_hash for key, source in compiled.items()}
+
+    if current != stale:
+        for key in sorted(current.keys() | stale.keys()):
+            if current.get(key) != stale.get(key):
+                print(f"Out of date: {key[0]}/{key[1]}")
+        return False
+
+    print(f"{output} is up to date")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate the knowledge base and write a compiled snapshot.")
+    parser.add_argument('--source', default=KNOWLEDGE_BASE_PATH)
+    parser.add_argument('--output', default=SNAPSHOT_PATH)
+    parser.add_argument('--force', action='store_true',
+                        help="write the snapshot even if some fault sections are malformed")
+    parser.add_argument('--check', action='store_true',
+                        help="only report whether the snapshot matches the YAML sources")
+    args = parser.parse_args()
+
+    if args.check:
+        ok = check_snapshot(args.source, args.output)
+    else:
+        ok = compile_knowledge_base(args.source, args.output, force=args.force)
+
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,68 @@
+import sys
+import os
+import time
+import uuid
+import argparse
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import sessionmaker
+from models.DB_class import Base, create_db_engine
+from models.query_class import Query
+from services.query_logger import QueryLogger
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(name, latencies, elapsed):
+    print(f"{name}: {len(latencies) / elapsed:8.0f} rows/s, "
+          f"p50 {percentile(latencies, 0.5) * 1000:.3f} ms, p99 {percentile(latencies, 0.99) * 1000:.3f} ms per request")
+
+
+def benchmark_sync(session_maker, count):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(count):
+        begin = time.perf_counter()
+        with session_maker() as session:
+            session.add(Query(text=f'benchmark query {i}', query_uuid=str(uuid.uuid4()), engine_type='hybrid'))
+            session.commit()
+        latencies.append(time.perf_counter() - begin)
+    report('synchronous commit', latencies, time.perf_counter() - start)
+
+
+def benchmark_logger(session_maker, count, batch_size):
+    query_logger = QueryLogger(session_maker, max_queue=count, batch_size=batch_size).start()
+    latencies = []
+    start = time.perf_counter()
+    parent = None
+    for i in range(count):
+        begin = time.perf_counter()
+        query_id = str(uuid.uuid4())
+        query_logger.log(query_id, f'benchmark query {i}', parent_query_uuid=parent, engine_type='hybrid')
+        parent = query_id
+        latencies.append(time.perf_counter() - begin)
+    query_logger.close()
+    report(f'write-behind (batch {batch_size})', latencies, time.perf_counter() - start)
+    print(f"  {query_logger.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure query-log write overhead against a database.")
+    parser.add_argument('--url', help="database URL (defaults to a temporary SQLite/WAL file)")
+    parser.add_argument('--count', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=200)
+    args = parser.parse_args()
+
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.sqlite3')}"
+    engine = create_db_engine(url)
+    Base.metadata.create_all(engine)
+    session_maker = sessionmaker(engine)
+
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    benchmark_sync(session_maker, args.count)
+    benchmark_logger(session_maker, args.count, args.batch_size)
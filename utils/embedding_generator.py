@@ -1,48 +1,129 @@
 import sys
 import os
-import pickle
+import json
+import hashlib
+import argparse
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sentence_transformers import SentenceTransformer
-from utils.yaml_parser import YamlReader
-from models.DB_class import session_maker
-from services.input_preprocessing import preprocess_user_query
-
-
-def generate_embeddings():
-    model = SentenceTransformer('transformer/marine_miniLM')
-    
-    with session_maker() as session:
-        yaml_reader = YamlReader(session)
-        all_faults = yaml_reader.get_all_faults()
-    
-    fault_embeddings = {}
-    
-    for fault in all_faults:
+import numpy as np
+from utils.knowledge_base import get_knowledge_base
+from utils.embedding_store import (
+    EMBEDDINGS_DIR, LEGACY_FILENAME, MATRIX_FILENAME, METADATA_FILENAME, FORMAT_VERSION,
+    load_legacy_pickle, save_embedding_store
+)
+from services.input_preprocessing import preprocess_many, PREPROCESSING_VERSION
+
+MODEL_PATH = 'transformer/marine_miniLM'
+
+
+def fault_text(fault):
+    text_parts = [fault['fault']['name']]
+    text_parts.extend(fault['fault'].get('symptoms', []))
+    return " ".join(text_parts)
+
+
+def content_hash(text):
+    digest = hashlib.sha1(PREPROCESSING_VERSION.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_existing_vectors(directory, model_path):
+    matrix_path = os.path.join(directory, MATRIX_FILENAME)
+    metadata_path = os.path.join(directory, METADATA_FILENAME)
+    if not (os.path.exists(matrix_path) and os.path.exists(metadata_path)):
+        return {}
+
+    with open(metadata_path, 'r') as f:
+        metadata = json.load(f)
+    if metadata.get('format_version') != FORMAT_VERSION or metadata.get('model') != model_path:
+        return {}
+
+    matrix = np.load(matrix_path, mmap_mode='r')
+    return {
+        entry['content_hash']: np.asarray(matrix[row], dtype=np.float32)
+        for row, entry in enumerate(metadata['faults']) if entry.get('content_hash')
+    }
+
+
+def preprocess_texts(texts, workers=None, chunksize=16):
+    return [processed for processed, _ in preprocess_many(texts, workers=workers, chunksize=chunksize)]
+
+
+def generate_embeddings(directory=EMBEDDINGS_DIR, dtype='float32', batch_size=64, workers=None, full=False):
+    faults_by_name = {}
+    for fault in get_knowledge_base().faults:
         if 'fault' not in fault:
             continue
-            
-        name = fault['fault']['name']
-        subsystem = fault['fault'].get('subsystem', '')
-        
-        text_parts = [name]
-        symptoms = fault['fault'].get('symptoms', [])
-        text_parts.extend(symptoms)
-        text = " ".join(text_parts)
-        
-        processed_text, _ = preprocess_user_query(text)
-        embedding = model.encode(processed_text, convert_to_tensor=True)
-        
-        fault_embeddings[name] = {
-            'embedding': embedding,
-            'fault': fault,
-            'subsystem': subsystem
-        }
-    
-    with open('data/embeddings/fault_embeddings.pkl', 'wb') as f:
-        pickle.dump(fault_embeddings, f)
+        faults_by_name[fault['fault']['name']] = fault
+
+    existing = {} if full else load_existing_vectors(directory, MODEL_PATH)
+
+    entries = []
+    vectors = []
+    pending_rows = []
+    pending_texts = []
+
+    for name, fault in faults_by_name.items():
+        text = fault_text(fault)
+        text_hash = content_hash(text)
+
+        entries.append({
+            'name': name,
+            'subsystem': fault['fault'].get('subsystem', ''),
+            'kb_subsystem': fault.get('_subsystem'),
+            'source_file': fault.get('_source_file'),
+            'fault_number': fault.get('_fault_number', 0),
+            'content_hash': text_hash
+        })
+
+        vector = existing.get(text_hash)
+        vectors.append(vector)
+        if vector is None:
+            pending_rows.append(len(vectors) - 1)
+            pending_texts.append(text)
+
+    if pending_texts:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(MODEL_PATH)
+
+        processed_texts = preprocess_texts(pending_texts, workers=workers)
+        encoded = model.encode(processed_texts, batch_size=batch_size, convert_to_numpy=True)
+        for row, vector in zip(pending_rows, encoded):
+            vectors[row] = vector
+
+    print(f"Encoded {len(pending_texts)} faults, reused {len(entries) - len(pending_texts)}")
+
+    save_embedding_store(
+        np.vstack(vectors), entries, directory, dtype=dtype,
+        model=MODEL_PATH, preprocessing_version=PREPROCESSING_VERSION
+    )
+
+
+def convert_legacy_embeddings(directory=EMBEDDINGS_DIR, dtype='float32'):
+    matrix, entries = load_legacy_pickle(os.path.join(directory, LEGACY_FILENAME))
+    save_embedding_store(matrix, entries, directory, dtype=dtype, model=MODEL_PATH)
 
 
 if __name__ == "__main__":
-    generate_embeddings()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build the fault embedding store.")
+    parser.add_argument('--output', default=EMBEDDINGS_DIR)
+    parser.add_argument('--dtype', choices=['float32', 'float16'], default='float32')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="preprocess fault texts in a process pool of this size")
+    parser.add_argument('--full', action='store_true',
+                        help="re-encode every fault instead of only new or changed ones")
+    parser.add_argument('--from-legacy', action='store_true',
+                        help="convert the old fault_embeddings.pkl instead of re-encoding")
+    args = parser.parse_args()
+
+    if args.from_legacy:
+        convert_legacy_embeddings(args.output, dtype=args.dtype)
+    else:
+        generate_embeddings(
+            args.output, dtype=args.dtype, batch_size=args.batch_size,
+            workers=args.workers, full=args.full
+        )
@@ -0,0 +1,145 @@
+import os
+import json
+import hashlib
+import pickle
+import numpy as np
+
+EMBEDDINGS_DIR = 'data/embeddings'
+MATRIX_FILENAME = 'fault_embeddings.npy'
+METADATA_FILENAME = 'fault_embeddings.json'
+LEGACY_FILENAME = 'fault_embeddings.pkl'
+
+FORMAT_VERSION = 1
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def save_embedding_store(matrix, entries, directory=EMBEDDINGS_DIR, dtype='float32', **extra_metadata):
+    """
+    Write a normalised embedding matrix and its metadata index. Each entry
+    describes one row: fault name, subsystem used for filtering, and the
+    knowledge-base subsystem/source file/fault number it points at.
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    matrix = normalize_rows(np.asarray(matrix, dtype=np.float32)).astype(dtype)
+
+    digest = hashlib.sha1(matrix.tobytes())
+    digest.update(json.dumps(entries, sort_keys=True).encode('utf-8'))
+
+    metadata = dict(extra_metadata)
+    metadata.update({
+        'format_version': FORMAT_VERSION,
+        'version': digest.hexdigest(),
+        'dtype': str(matrix.dtype),
+        'shape': list(matrix.shape),
+        'normalized': True,
+        'faults': entries
+    })
+
+    matrix_path = os.path.join(directory, MATRIX_FILENAME)
+    metadata_path = os.path.join(directory, METADATA_FILENAME)
+
+    with open(matrix_path + '.tmp', 'wb') as f:
+        np.save(f, matrix)
+    with open(metadata_path + '.tmp', 'w') as f:
+        json.dump(metadata, f)
+
+    os.replace(matrix_path + '.tmp', matrix_path)
+    os.replace(metadata_path + '.tmp', metadata_path)
+
+
+def load_legacy_pickle(path):
+    with open(path, 'rb') as f:
+        fault_embeddings = pickle.load(f)
+
+    vectors = []
+    entries = []
+    for name, data in fault_embeddings.items():
+        embedding = data['embedding']
+        if hasattr(embedding, 'cpu'):
+            embedding = embedding.cpu().numpy()
+        vectors.append(np.asarray(embedding, dtype=np.float32).reshape(-1))
+
+        fault = data.get('fault', {})
+        entries.append({
+            'name': name,
+            'subsystem': data.get('subsystem', ''),
+            'kb_subsystem': fault.get('_subsystem'),
+            'source_file': fault.get('_source_file'),
+            'fault_number': fault.get('_fault_number', 0)
+        })
+
+    if vectors:
+        matrix = np.vstack(vectors)
+    else:
+        matrix = np.zeros((0, 0), dtype=np.float32)
+
+    return matrix, entries
+
+
+class EmbeddingStore:
+    def __init__(self, directory=EMBEDDINGS_DIR):
+        self.directory = directory
+        self.metadata = {}
+
+        matrix_path = os.path.join(directory, MATRIX_FILENAME)
+        metadata_path = os.path.join(directory, METADATA_FILENAME)
+        legacy_path = os.path.join(directory, LEGACY_FILENAME)
+
+        if os.path.exists(matrix_path) and os.path.exists(metadata_path):
+            with open(metadata_path, 'r') as f:
+                self.metadata = json.load(f)
+            if self.metadata.get('format_version') != FORMAT_VERSION:
+                raise ValueError(
+                    f"Unsupported embedding store format {self.metadata.get('format_version')}. "
+                    "Please run: python utils/embedding_generator.py"
+                )
+
+            matrix = np.load(matrix_path, mmap_mode='r')
+            if not self.metadata.get('normalized'):
+                matrix = normalize_rows(np.asarray(matrix, dtype=np.float32))
+            entries = self.metadata['faults']
+        elif os.path.exists(legacy_path):
+            # Workers never unpickle: it is unsafe, needs torch and gives each
+            # process a private copy instead of a shared memory map.
+            raise FileNotFoundError(
+                f"Only the legacy {legacy_path} was found. "
+                "Please run: python utils/embedding_generator.py --from-legacy"
+            )
+        else:
+            raise FileNotFoundError("Embeddings file not found. Please run: python utils/embedding_generator.py")
+
+        self.matrix = matrix
+        self.entries = entries
+        self._build_rows()
+
+    @property
+    def version(self):
+        return self.metadata.get('version', '')
+
+    def _build_rows(self):
+        self.fault_names = [entry['name'] for entry in self.entries]
+        self.fault_subsystems = [entry.get('subsystem') or '' for entry in self.entries]
+
+        subsystems = np.array(self.fault_subsystems, dtype=object)
+        unscoped = subsystems == ''
+        self.unscoped_rows = np.flatnonzero(unscoped)
+        self.subsystem_rows = {
+            subsystem: np.flatnonzero((subsystems == subsystem) | unscoped)
+            for subsystem in set(self.fault_subsystems) if subsystem
+        }
+
+    def rows_for(self, target_subsystem):
+        if not target_subsystem:
+            return None
+        return self.subsystem_rows.get(target_subsystem, self.unscoped_rows)
+
+    def fault_for(self, row, snapshot):
+        entry = self.entries[row]
+        key = (entry.get('kb_subsystem'), entry.get('source_file'), entry['name'])
+        return snapshot.by_key.get(key) or snapshot.get_fault_by_name(entry['name'])
@@ -0,0 +1,406 @@
+import re
+import os
+import sys
+import marshal
+import hashlib
+import threading
+import yaml
+
+KNOWLEDGE_BASE_PATH = 'knowledge_base'
+SNAPSHOT_PATH = 'data/knowledge_base.snapshot'
+
+SNAPSHOT_MAGIC = b'VCEKB'
+SNAPSHOT_FORMAT_VERSION = 3
+
+fault_header_pattern = re.compile(r'## Fault (\d+)')
+
+SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def make_fault_id(subsystem, filename, fault_number):
+    return f"{subsystem}/{os.path.splitext(filename)[0]}/{fault_number}"
+
+
+def fault_detail(fault):
+    tree = fault['fault']
+    return {
+        'id': fault.get('_id'),
+        'name': tree.get('name'),
+        'subsystem': fault.get('_subsystem'),
+        'source_file': fault.get('_source_file', 'unknown'),
+        'fault_number': fault.get('_fault_number', 0),
+        'symptoms': tree.get('symptoms', []),
+        'causes': tree.get('causes', []),
+        'actions': tree.get('actions', [])
+    }
+
+
+def parse_fault_file(content, filename, subsystem, errors=None):
+    faults = []
+    if errors is None:
+        errors = []
+
+    # Ids use the number declared in the "## Fault N" header rather than the
+    # position, so adding or removing a fault does not renumber the rest.
+    sectioned = '## Fault' in content
+    if sectioned:
+        parts = fault_header_pattern.split(content)
+        sections = [(i, int(number), section) for i, (number, section) in enumerate(zip(parts[1::2], parts[2::2]), 1)]
+    else:
+        sections = [(1, 1, content)]
+
+    declared = set()
+    for i, number, section in sections:
+        if sectioned and not section.strip().startswith('fault:'):
+            section = 'fault:' + section
+
+        try:
+            fault_data = yaml.load(section, Loader=SafeLoader)
+        except yaml.YAMLError as e:
+            errors.append(f"{subsystem}/{filename} fault {i}: invalid YAML: {e}")
+            continue
+
+        if not isinstance(fault_data, dict) or not isinstance(fault_data.get('fault'), dict):
+            errors.append(f"{subsystem}/{filename} fault {i}: missing 'fault' mapping")
+            continue
+        if not fault_data['fault'].get('name'):
+            errors.append(f"{subsystem}/{filename} fault {i}: missing fault name")
+
+        fault_id = number
+        if number in declared:
+            errors.append(f"{subsystem}/{filename} fault {i}: duplicate fault number {number}")
+            fault_id = f"{number}-{i}"
+        declared.add(number)
+
+        fault_data['_source_file'] = filename
+        fault_data['_fault_number'] = i
+        fault_data['_subsystem'] = subsystem
+        fault_data['_id'] = make_fault_id(subsystem, filename, fault_id)
+        faults.append(fault_data)
+
+    return faults
+
+
+class SourceFile:
+    __slots__ = ('subsystem', 'filename', 'path', 'mtime', 'size', 'content_hash', 'faults', 'errors')
+
+    def __init__(self, subsystem, filename, path, mtime, size, content_hash, faults, errors=None):
+        self.subsystem = subsystem
+        self.filename = filename
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        self.content_hash = content_hash
+        self.faults = faults
+        self.errors = errors or []
+
+
+def write_compiled_snapshot(snapshot, path=SNAPSHOT_PATH):
+    payload = {
+        'format_version': SNAPSHOT_FORMAT_VERSION,
+        'python': list(sys.version_info[:2]),
+        'source_hash': snapshot.version,
+        'files': [
+            {
+                'subsystem': source.subsystem,
+                'filename': source.filename,
+                'path': source.path,
+                'content_hash': source.content_hash,
+                'faults': source.faults,
+                'errors': source.errors
+            }
+            for source in snapshot.sources.values()
+        ]
+    }
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    with open(path + '.tmp', 'wb') as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(marshal.dumps(payload))
+    os.replace(path + '.tmp', path)
+
+
+def read_compiled_snapshot(path=SNAPSHOT_PATH):
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return {}
+
+    if not data.startswith(SNAPSHOT_MAGIC):
+        return {}
+
+    try:
+        payload = marshal.loads(data[len(SNAPSHOT_MAGIC):])
+    except (ValueError, EOFError, TypeError):
+        return {}
+
+    if (payload.get('format_version') != SNAPSHOT_FORMAT_VERSION or
+            payload.get('python') != list(sys.version_info[:2])):
+        return {}
+
+    return {
+        (entry['subsystem'], entry['filename']): SourceFile(
+            entry['subsystem'], entry['filename'], entry['path'],
+            None, None, entry['content_hash'], entry['faults'], entry['errors']
+        )
+        for entry in payload['files']
+    }
+
+
+class KnowledgeBaseSnapshot:
+    def __init__(self, sources):
+        self.sources = sources
+        self.faults = []
+        self.tree = {}
+        self.by_key = {}
+        self.by_name = {}
+        self.by_id = {}
+        self.by_subsystem_name = {}
+        self.derived = {}
+
+        digest = hashlib.sha1()
+        for (subsystem, filename), source in sources.items():
+            digest.update(f'{subsystem}/{filename}\0{source.content_hash}\0'.encode('utf-8'))
+
+            self.tree.setdefault(subsystem, {})[filename] = source.faults
+            for fault in source.faults:
+                name = fault['fault'].get('name')
+                self.faults.append(fault)
+                self.by_key.setdefault((subsystem, filename, name), fault)
+                self.by_subsystem_name.setdefault((subsystem, name), fault)
+                self.by_name[name] = fault
+                self.by_id[fault['_id']] = fault
+
+        self.version = digest.hexdigest()
+
+    def subsystems(self):
+        return list(self.tree.keys())
+
+    def errors(self):
+        return [error for source in self.sources.values() for error in source.errors]
+
+    def select_files(self, subsystem=None, file_filters=None):
+        if subsystem:
+            subsystems = [subsystem]
+        else:
+            subsystems = self.tree.keys()
+
+        selected = []
+        for subsystem_name in subsystems:
+            files = self.tree.get(subsystem_name)
+            if not files:
+                continue
+
+            if file_filters:
+                files_to_process = []
+                for pattern in file_filters:
+                    regex_pattern = pattern.replace('.', r'\.').replace('*', '.*')
+                    for file in files:
+                        if re.match(regex_pattern, file) and file not in files_to_process:
+                            files_to_process.append(file)
+            else:
+                files_to_process = list(files)
+
+            selected.extend((subsystem_name, filename) for filename in files_to_process)
+
+        return selected
+
+    def get_all_faults(self, subsystem=None, file_filters=None):
+        results = []
+        for subsystem_name, filename in self.select_files(subsystem, file_filters):
+            results.extend(self.tree[subsystem_name][filename])
+        return results
+
+    def get_fault(self, subsystem, fault_name):
+        return self.by_subsystem_name.get((subsystem, fault_name))
+
+    def get_fault_by_name(self, fault_name):
+        return self.by_name.get(fault_name)
+
+    def get_fault_by_id(self, fault_id):
+        return self.by_id.get(fault_id)
+
+
+class KnowledgeBase:
+    """
+    Holds the current KnowledgeBaseSnapshot. Reloads build a new snapshot,
+    re-parsing only files whose mtime or size changed, run the registered
+    compilers for it and then swap it in with a single assignment, so a
+    request that grabbed `snapshot` keeps a consistent view. At startup the
+    compiled snapshot written by utils/compile_kb.py is used for every file
+    whose content hash still matches, so only stale files are parsed.
+    """
+
+    def __init__(self, base_path=KNOWLEDGE_BASE_PATH, snapshot_path=SNAPSHOT_PATH):
+        self.base_path = base_path
+        self.snapshot_path = snapshot_path
+        self.snapshot = KnowledgeBaseSnapshot({})
+        self._compilers = {}
+        self._reload_lock = threading.Lock()
+        self.load()
+
+    @property
+    def faults(self):
+        return self.snapshot.faults
+
+    @property
+    def tree(self):
+        return self.snapshot.tree
+
+    @property
+    def by_key(self):
+        return self.snapshot.by_key
+
+    @property
+    def by_name(self):
+        return self.snapshot.by_name
+
+    @property
+    def version(self):
+        return self.snapshot.version
+
+    def _list_files(self):
+        files = []
+        if not os.path.isdir(self.base_path):
+            return files
+
+        for subsystem in sorted(os.listdir(self.base_path)):
+            subsystem_path = os.path.join(self.base_path, subsystem)
+            if not os.path.isdir(subsystem_path):
+                continue
+
+            for filename in sorted(os.listdir(subsystem_path)):
+                if filename.endswith('.yaml'):
+                    files.append((subsystem, filename, os.path.join(subsystem_path, filename)))
+
+        return files
+
+    def _read_source(self, subsystem, filename, path, stat, previous):
+        with open(path, 'r') as file:
+            content = file.read()
+
+        content_hash = hashlib.sha1(content.encode('utf-8')).hexdigest()
+        if previous is not None and previous.content_hash == content_hash:
+            faults = previous.faults
+            errors = previous.errors
+        else:
+            errors = []
+            faults = parse_fault_file(content, filename, subsystem, errors)
+
+        return SourceFile(subsystem, filename, path, stat.st_mtime, stat.st_size, content_hash, faults, errors)
+
+    def _scan(self, previous_sources):
+        sources = {}
+        for subsystem, filename, path in self._list_files():
+            previous = previous_sources.get((subsystem, filename))
+            try:
+                stat = os.stat(path)
+                if previous is not None and previous.mtime == stat.st_mtime and previous.size == stat.st_size:
+                    sources[(subsystem, filename)] = previous
+                else:
+                    sources[(subsystem, filename)] = self._read_source(subsystem, filename, path, stat, previous)
+            except OSError:
+                continue
+        return sources
+
+    def load(self):
+        compiled = read_compiled_snapshot(self.snapshot_path) if self.snapshot_path else {}
+        with self._reload_lock:
+            self._swap(self._scan(compiled))
+
+    def reload(self):
+        with self._reload_lock:
+            previous = self.snapshot
+            sources = self._scan(previous.sources)
+
+            changed = sources.keys() != previous.sources.keys() or any(
+                source.content_hash != previous.sources[key].content_hash
+                for key, source in sources.items()
+            )
+            if not changed:
+                previous.sources = sources
+                return False
+
+            self._swap(sources)
+            return True
+
+    def _swap(self, sources):
+        previous = self.snapshot
+        snapshot = KnowledgeBaseSnapshot(sources)
+        for key, compiler in list(self._compilers.items()):
+            snapshot.derived[key] = compiler(snapshot, previous)
+        self.snapshot = snapshot
+
+    def register_compiler(self, key, compiler):
+        self._compilers[key] = compiler
+
+    def derived(self, key, snapshot=None):
+        snapshot = snapshot or self.snapshot
+        value = snapshot.derived.get(key)
+        if value is None:
+            compiler = self._compilers.get(key)
+            if compiler is not None:
+                value = snapshot.derived[key] = compiler(snapshot, None)
+        return value
+
+    def subsystems(self):
+        return self.snapshot.subsystems()
+
+    def select_files(self, subsystem=None, file_filters=None):
+        return self.snapshot.select_files(subsystem, file_filters)
+
+    def get_all_faults(self, subsystem=None, file_filters=None):
+        return self.snapshot.get_all_faults(subsystem, file_filters)
+
+    def get_fault(self, subsystem, fault_name):
+        return self.snapshot.get_fault(subsystem, fault_name)
+
+    def get_fault_by_name(self, fault_name):
+        return self.snapshot.get_fault_by_name(fault_name)
+
+    def get_fault_by_id(self, fault_id):
+        return self.snapshot.get_fault_by_id(fault_id)
+
+
+class KnowledgeBaseWatcher:
+    def __init__(self, knowledge_base, interval=2.0):
+        self.knowledge_base = knowledge_base
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='knowledge-base-watcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.knowledge_base.reload()
+            except Exception:
+                continue
+
+
+_knowledge_base = None
+_knowledge_base_lock = threading.Lock()
+
+
+def get_knowledge_base():
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _knowledge_base_lock:
+            if _knowledge_base is None:
+                _knowledge_base = KnowledgeBase()
+    return _knowledge_base
@@ -0,0 +1,143 @@
+import sys
+import os
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import psutil
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    'flask': [sys.executable, '-c', "import logging; from app import app; logging.getLogger('werkzeug').setLevel(logging.WARNING); app.run(port={port}, threaded=True)"],
+    'asgi': [sys.executable, '-m', 'uvicorn', 'asgi:app', '--port', '{port}', '--log-level', 'warning']
+}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def load_queries(path, limit):
+    with open(path, 'r') as f:
+        data = json.load(f)
+    queries = []
+    for item in data:
+        queries.append(item['query'])
+        queries.extend(item.get('similar_queries', []))
+    return queries[:limit]
+
+
+def start_server(name, port):
+    command = [part.format(port=port) for part in SERVERS[name]]
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL)
+
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{name} server exited with code {process.returncode}")
+        try:
+            httpx.post(f'http://127.0.0.1:{port}/api/reset_conversation', timeout=1.0)
+            return process
+        except httpx.TransportError:
+            time.sleep(0.25)
+
+    process.terminate()
+    raise RuntimeError(f"{name} server did not start within 120s")
+
+
+def server_cpu_seconds(process):
+    processes = [process] + process.children(recursive=True)
+    total = 0.0
+    for proc in processes:
+        try:
+            times = proc.cpu_times()
+        except psutil.NoSuchProcess:
+            continue
+        total += times.user + times.system
+    return total
+
+
+async def client(base_url, queries, deadline, engine, latencies, errors):
+    # one client per conversation, like one browser tab
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as http:
+        i = 0
+        while time.perf_counter() < deadline:
+            begin = time.perf_counter()
+            try:
+                response = await http.post('/api/diagnose', json={
+                    'query': queries[i % len(queries)],
+                    'engine': engine,
+                    'view': 'compact'
+                })
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - begin)
+                else:
+                    errors.append(response.status_code)
+            except httpx.HTTPError as e:
+                errors.append(type(e).__name__)
+            i += 1
+
+
+async def drive(base_url, queries, concurrency, duration, engine):
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(
+        client(base_url, queries[i::concurrency] or queries, deadline, engine, latencies, errors)
+        for i in range(concurrency)
+    ))
+    return latencies, errors
+
+
+def benchmark(name, queries, port, concurrency, duration, warmup, engine):
+    process = start_server(name, port)
+    try:
+        server = psutil.Process(process.pid)
+        base_url = f'http://127.0.0.1:{port}'
+
+        asyncio.run(drive(base_url, queries, concurrency, warmup, engine))
+
+        cpu_before = server_cpu_seconds(server)
+        start = time.perf_counter()
+        latencies, errors = asyncio.run(drive(base_url, queries, concurrency, duration, engine))
+        elapsed = time.perf_counter() - start
+        cpu_seconds = server_cpu_seconds(server) - cpu_before
+    finally:
+        process.terminate()
+        process.wait()
+
+    if not latencies:
+        print(f"{name}: no successful requests ({len(errors)} errors)")
+        return
+
+    print(f"{name:5}: {len(latencies) / elapsed:7.1f} req/s, "
+          f"{len(latencies) / max(cpu_seconds, 1e-9):7.1f} req per CPU-second, "
+          f"p50 {percentile(latencies, 0.5) * 1000:.1f} ms, p99 {percentile(latencies, 0.99) * 1000:.1f} ms, "
+          f"{len(errors)} errors")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare /api/diagnose throughput of the Flask and ASGI servers.")
+    parser.add_argument('--server', choices=['flask', 'asgi', 'both'], default='both')
+    parser.add_argument('--queries', default='data/train_data.json')
+    parser.add_argument('--limit', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=30.0)
+    parser.add_argument('--warmup', type=float, default=5.0)
+    parser.add_argument('--engine', default='hybrid', choices=['rule', 'neural', 'hybrid'])
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries, args.limit)
+    print(f"{len(queries)} queries, {args.concurrency} concurrent clients, {args.duration:.0f}s per server")
+
+    names = ['flask', 'asgi'] if args.server == 'both' else [args.server]
+    for name in names:
+        benchmark(name, queries, args.port, args.concurrency, args.duration, args.warmup, args.engine)
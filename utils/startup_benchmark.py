@@ -0,0 +1,75 @@
+import sys
+import os
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    'rule': {
+        'code': "from services.rule_engine import RuleEngine; from services import process_query, DiagnosisCache",
+        'forbidden': ['torch', 'sentence_transformers', 'nltk', 'symspellpy']
+    },
+    'services': {
+        'code': "import services; from services import *",
+        'forbidden': ['torch', 'sentence_transformers']
+    }
+}
+
+
+def parse_importtime(stderr):
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return imports
+
+
+def run_scenario(name, top=10):
+    scenario = SCENARIOS[name]
+    code = (
+        "import sys, json\n" + scenario['code'] + "\n"
+        f"print(json.dumps([m for m in {scenario['forbidden']!r} if m in sys.modules]))"
+    )
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{name}: import failed\n{result.stderr[-2000:]}")
+
+    imports = parse_importtime(result.stderr)
+    total_ms = sum(cumulative for _, depth, _, cumulative in imports if depth == 0) / 1000.0
+    slowest = sorted(imports, key=lambda entry: entry[3], reverse=True)[:top]
+    forbidden = json.loads(result.stdout.strip().splitlines()[-1])
+
+    return total_ms, slowest, forbidden
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure cold import time with python -X importtime and enforce a budget.")
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append')
+    parser.add_argument('--budget-ms', type=float, default=200.0,
+                        help="fail if a scenario's cumulative import time exceeds this")
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    ok = True
+    for name in args.scenario or sorted(SCENARIOS):
+        total_ms, slowest, forbidden = run_scenario(name, args.top)
+        print(f"{name}: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+        for module, _, self_us, cumulative_us in slowest:
+            print(f"  {cumulative_us / 1000.0:8.1f} ms  {module}")
+
+        if total_ms > args.budget_ms:
+            print(f"FAIL: {name} is over the import time budget")
+            ok = False
+        if forbidden:
+            print(f"FAIL: {name} imported {', '.join(forbidden)}")
+            ok = False
+
+    sys.exit(0 if ok else 1)
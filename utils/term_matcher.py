@@ -0,0 +1,93 @@
+from collections import deque
+
+
+class TermMatch:
+    __slots__ = ('term', 'start', 'end', 'payloads')
+
+    def __init__(self, term, start, end, payloads):
+        self.term = term
+        self.start = start
+        self.end = end
+        self.payloads = payloads
+
+    def __repr__(self):
+        return f"TermMatch({self.term!r}, {self.start}, {self.end})"
+
+
+class TermMatcher:
+    """
+    Aho-Corasick automaton over a set of lowercase terms. One pass over a text
+    reports every occurrence of every term, including overlapping ones, so a
+    term matches exactly when `term in text` would.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._terminal = [[]]
+        self._output = [[]]
+        self._terms = []
+        self._payloads = []
+        self._term_ids = {}
+        self._built = True
+
+    def add(self, term, kind, value=None):
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            term_id = len(self._terms)
+            self._term_ids[term] = term_id
+            self._terms.append(term)
+            self._payloads.append([])
+
+            node = 0
+            for char in term:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._terminal.append([])
+                    self._goto[node][char] = next_node
+                node = next_node
+            self._terminal[node].append(term_id)
+            self._built = False
+
+        self._payloads[term_id].append((kind, value))
+
+    def build(self):
+        self._output = [list(terminal) for terminal in self._terminal]
+        queue = deque(self._goto[0].values())
+
+        while queue:
+            node = queue.popleft()
+            for char, next_node in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_node] = fail
+                self._output[next_node] = self._output[next_node] + self._output[fail]
+                queue.append(next_node)
+
+        self._built = True
+
+    def find(self, text):
+        if not self._built:
+            self.build()
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+
+        matches = []
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            for term_id in output[node]:
+                term = self._terms[term_id]
+                matches.append(TermMatch(term, position + 1 - len(term), position + 1, self._payloads[term_id]))
+
+        return matches